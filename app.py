@@ -10,21 +10,11 @@ import os
 from pathlib import Path
 
 # Import custom utilities
-from utils.auth import login, signup, logout, check_authentication, check_stored_session, get_supabase_client
-from utils.database import (
-    get_monthly_revenue,
-    get_revenue_by_plan,
-    get_cohort_retention,
-    get_current_metrics
-)
-from utils.charts import (
-    create_mrr_chart,
-    create_customer_chart,
-    create_churn_chart,
-    create_plan_revenue_chart,
-    create_cohort_retention_table
-)
-from utils.ai_insights import generate_executive_summary, answer_metric_question
+from utils.auth import login, signup, logout, check_authentication, check_stored_session
+from utils.data_loaders import load_datasets, clear_data_cache
+from utils.cache import CHART_CACHE_TTL, DATAFRAME_HASH_FUNCS
+# utils.charts (plotly) and utils.ai_insights (anthropic) are imported inside
+# the page functions that use them, so the login page doesn't pay for them
 
 # Page configuration
 st.set_page_config(
@@ -112,31 +102,29 @@ def show_dashboard():
         if st.session_state.user:
             st.markdown(f"**User:** {st.session_state.user.email}")
         
+        if st.button("Refresh data", use_container_width=True):
+            clear_data_cache()
+            st.rerun()
+        
         if st.button("Logout", use_container_width=True):
             logout()
             st.rerun()
     
-    # Get Supabase client
-    supabase = get_supabase_client()
-    
-    # Fetch data
-    revenue_df = get_monthly_revenue(supabase, months=12)
-    plan_df = get_revenue_by_plan(supabase, months=12)
-    cohort_df = get_cohort_retention(supabase, cohorts=6)
-    current_metrics = get_current_metrics(supabase)
-    
-    # Show selected page
+    # Show selected page, fetching only the data it needs in one parallel
+    # round (cached across reruns, see utils/data_loaders.py)
     if page == "Overview":
-        show_overview_page(current_metrics, revenue_df, plan_df)
+        show_overview_page(*load_datasets("metrics", "revenue", "plans", months=12))
     elif page == "Revenue Analytics":
-        show_revenue_page(revenue_df, plan_df)
+        show_revenue_page(*load_datasets("revenue", "plans", months=12))
     elif page == "Customer Insights":
-        show_customer_page(revenue_df, cohort_df)
+        show_customer_page(*load_datasets("revenue", "cohorts", months=12, cohorts=6))
     elif page == "AI Insights":
-        show_ai_insights_page(current_metrics, revenue_df, plan_df)
+        show_ai_insights_page(*load_datasets("metrics", "revenue", "plans", months=12))
 
 def show_overview_page(metrics: dict, revenue_df: pd.DataFrame, plan_df: pd.DataFrame):
     """Display overview page with key metrics."""
+    from utils.charts import create_mrr_chart, create_customer_chart
+    
     st.title("📈 Dashboard Overview")
     st.markdown(f"**Last Updated:** {datetime.now().strftime('%B %d, %Y at %I:%M %p')}")
     
@@ -192,6 +180,8 @@ def show_overview_page(metrics: dict, revenue_df: pd.DataFrame, plan_df: pd.Data
 
 def show_revenue_page(revenue_df: pd.DataFrame, plan_df: pd.DataFrame):
     """Display revenue analytics page."""
+    from utils.charts import create_mrr_chart, create_plan_revenue_chart
+    
     st.title("💰 Revenue Analytics")
     
     if revenue_df.empty:
@@ -219,13 +209,33 @@ def show_revenue_page(revenue_df: pd.DataFrame, plan_df: pd.DataFrame):
         st.subheader("Plan Breakdown Table")
         if not plan_df.empty:
             latest_month = plan_df['month'].max()
-            latest_plan_data = plan_df[plan_df['month'] == latest_month][['plan_tier', 'revenue', 'customer_count']]
-            latest_plan_data.columns = ['Plan', 'Revenue', 'Customers']
-            latest_plan_data['Revenue'] = latest_plan_data['Revenue'].apply(lambda x: f"${x:,.2f}")
-            st.dataframe(latest_plan_data, use_container_width=True, hide_index=True)
+            latest_plan_data = plan_df.loc[
+                plan_df['month'].values == latest_month,
+                ['plan_tier', 'revenue', 'customer_count']
+            ].rename(columns={'plan_tier': 'Plan', 'revenue': 'Revenue', 'customer_count': 'Customers'})
+            st.dataframe(
+                latest_plan_data.style.format({'Revenue': '${:,.2f}'}),
+                use_container_width=True,
+                hide_index=True
+            )
+
+@st.cache_data(ttl=CHART_CACHE_TTL, show_spinner=False, hash_funcs=DATAFRAME_HASH_FUNCS)
+def _recent_trends(revenue_df: pd.DataFrame) -> pd.DataFrame:
+    """Build the 3-row new/churned customers table for the Customer page."""
+    recent = revenue_df.tail(3)[['month', 'new_customers', 'churn_count']].copy()
+    recent['month'] = recent['month'].dt.strftime('%Y-%m')
+    recent.columns = ['Month', 'New', 'Churned']
+    return recent
 
 def show_customer_page(revenue_df: pd.DataFrame, cohort_df: pd.DataFrame):
     """Display customer insights page."""
+    from utils.charts import (
+        create_customer_chart,
+        create_churn_chart,
+        create_cohort_retention_table,
+        style_cohort_retention_table
+    )
+    
     st.title("👥 Customer Insights")
     
     # Customer growth chart
@@ -248,10 +258,7 @@ def show_customer_page(revenue_df: pd.DataFrame, cohort_df: pd.DataFrame):
     with col2:
         st.subheader("Recent Trends")
         if not revenue_df.empty:
-            recent = revenue_df.tail(3)[['month', 'new_customers', 'churn_count']].copy()
-            recent['month'] = recent['month'].dt.strftime('%Y-%m')
-            recent.columns = ['Month', 'New', 'Churned']
-            st.dataframe(recent, use_container_width=True, hide_index=True)
+            st.dataframe(_recent_trends(revenue_df), use_container_width=True, hide_index=True)
     
     # Cohort retention
     st.markdown("---")
@@ -260,27 +267,48 @@ def show_customer_page(revenue_df: pd.DataFrame, cohort_df: pd.DataFrame):
     if not cohort_df.empty:
         cohort_table = create_cohort_retention_table(cohort_df)
         if cohort_table is not None:
-            # Style the dataframe
-            styled_table = cohort_table.style.format("{:.1f}%")\
-                .background_gradient(cmap='RdYlGn', vmin=0, vmax=100)
-            st.dataframe(styled_table, use_container_width=True)
+            st.dataframe(style_cohort_retention_table(cohort_table), use_container_width=True)
             st.caption("Retention rates by cohort month (rows) and months since signup (columns)")
     else:
         st.info("No cohort data available yet.")
 
+def _render_stream(render, chunks) -> str:
+    """Progressively render streamed text chunks.
+    
+    Args:
+        render: Placeholder element method to redraw with, e.g. st.empty().info
+        chunks: Iterator of text chunks; a ReplaceText chunk (such as an error
+            after a partial reply) replaces the text rendered so far
+        
+    Returns:
+        The full rendered text
+    """
+    from utils.ai_insights import ReplaceText
+    
+    text = ""
+    for chunk in chunks:
+        text = chunk if isinstance(chunk, ReplaceText) else text + chunk
+        render(text)
+    return text
+
 def show_ai_insights_page(metrics: dict, revenue_df: pd.DataFrame, plan_df: pd.DataFrame):
     """Display AI-powered insights page."""
+    from utils.ai_insights import get_claude_client, stream_executive_summary
+    
     st.title("🤖 AI-Powered Insights")
     
     if not metrics:
         st.warning("⚠️ No data available for AI analysis.")
         return
     
+    _, client_issue = get_claude_client()
+    if client_issue:
+        st.warning(client_issue)
+    
     # Executive Summary
     st.subheader("📋 Executive Summary")
     with st.spinner("Generating AI summary..."):
-        summary = generate_executive_summary(metrics, revenue_df)
-        st.info(summary)
+        _render_stream(st.empty().info, stream_executive_summary(metrics, revenue_df))
     
     st.markdown("---")
     
@@ -298,13 +326,23 @@ def show_ai_insights_page(metrics: dict, revenue_df: pd.DataFrame, plan_df: pd.D
         - What should I focus on this month?
         """)
     
+    _ai_qa_fragment(metrics, revenue_df, plan_df)
+
+@st.fragment
+def _ai_qa_fragment(metrics: dict, revenue_df: pd.DataFrame, plan_df: pd.DataFrame):
+    """Question/answer panel for the AI Insights page.
+    
+    Runs as a fragment so submitting a question only reruns this block,
+    not the whole dashboard (data loading, executive summary, sidebar).
+    """
+    from utils.ai_insights import stream_metric_answer
+    
     question = st.text_input("Your question:", placeholder="e.g., What's my biggest growth opportunity?")
     
     if st.button("Get AI Insight", type="primary"):
         if question:
             with st.spinner("Analyzing your data..."):
-                answer = answer_metric_question(question, metrics, revenue_df, plan_df)
-                st.success(answer)
+                _render_stream(st.empty().success, stream_metric_answer(question, metrics, revenue_df, plan_df))
         else:
             st.warning("Please enter a question")
 
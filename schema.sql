@@ -51,3 +51,39 @@ CREATE INDEX IF NOT EXISTS idx_customers_status ON customers(status);
 CREATE INDEX IF NOT EXISTS idx_monthly_revenue_month ON monthly_revenue(month);
 CREATE INDEX IF NOT EXISTS idx_revenue_by_plan_month ON revenue_by_plan(month);
 CREATE INDEX IF NOT EXISTS idx_cohort_retention_cohort_month ON cohort_retention(cohort_month);
+
+-- Reset the metrics tables in one round-trip (used by seed_data.py)
+CREATE OR REPLACE FUNCTION reset_saas_tables() RETURNS void
+LANGUAGE sql AS $$
+    TRUNCATE monthly_revenue, revenue_by_plan, cohort_retention RESTART IDENTITY;
+$$;
+
+-- Current month's headline metrics, with growth against the previous month,
+-- as a single row (used by utils/database.py get_current_metrics)
+CREATE OR REPLACE FUNCTION current_metrics()
+RETURNS TABLE (
+    mrr DECIMAL(10, 2),
+    mrr_growth DOUBLE PRECISION,
+    customers INTEGER,
+    customer_growth DOUBLE PRECISION,
+    churn_rate DOUBLE PRECISION,
+    new_customers INTEGER
+)
+LANGUAGE sql STABLE AS $$
+    WITH recent AS (
+        SELECT month, mrr, customer_count, churn_count, new_customers,
+               COALESCE(LAG(mrr) OVER (ORDER BY month), mrr) AS prev_mrr,
+               COALESCE(LAG(customer_count) OVER (ORDER BY month), customer_count) AS prev_customers
+        FROM (SELECT * FROM monthly_revenue ORDER BY month DESC LIMIT 2) last_two
+    )
+    SELECT
+        mrr,
+        CASE WHEN prev_mrr > 0 THEN ((mrr - prev_mrr) / prev_mrr * 100)::DOUBLE PRECISION ELSE 0 END,
+        customer_count,
+        CASE WHEN prev_customers > 0 THEN ((customer_count - prev_customers)::DOUBLE PRECISION / prev_customers * 100) ELSE 0 END,
+        CASE WHEN customer_count > 0 THEN (churn_count::DOUBLE PRECISION / customer_count * 100) ELSE 0 END,
+        new_customers
+    FROM recent
+    ORDER BY month DESC
+    LIMIT 1;
+$$;
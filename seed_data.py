@@ -4,15 +4,20 @@ Run this script after setting up your Supabase database and .env file.
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
-import random
 import numpy as np
-from supabase import create_client
+import pandas as pd
+import httpx
+from supabase import ClientOptions, create_client
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Single seeded generator for all sample data (reproducible seeds)
+rng = np.random.default_rng(42)
+
 # Plan pricing
 PLAN_PRICES = {
     'starter': 29,
@@ -20,6 +25,10 @@ PLAN_PRICES = {
     'enterprise': 299
 }
 
+# Rows per insert request, and how many requests to keep in flight
+INSERT_BATCH_SIZE = 500
+INSERT_WORKERS = 4
+
 def get_supabase_client():
     """Initialize Supabase client."""
     url = os.getenv("SUPABASE_URL")
@@ -28,110 +37,94 @@ def get_supabase_client():
     if not url or not key:
         raise ValueError("Missing Supabase credentials. Check your .env file.")
     
-    return create_client(url, key)
+    # One keep-alive HTTP/2 pool shared by every request the seed makes
+    http_client = httpx.Client(
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=INSERT_WORKERS),
+        timeout=30
+    )
+    return create_client(url, key, options=ClientOptions(httpx_client=http_client))
 
 def generate_monthly_data(months=12):
     """Generate realistic monthly revenue data."""
-    data = []
     base_customers = 50
     base_mrr = 5000
     
     # Start date (12 months ago)
-    start_date = datetime.now() - relativedelta(months=months-1)
+    start_date = datetime.now().replace(day=1) - relativedelta(months=months-1)
+    month_strs = pd.date_range(start_date.date(), periods=months, freq='MS').strftime('%Y-%m-01').tolist()
     
-    for i in range(months):
-        month_date = start_date + relativedelta(months=i)
-        
-        # Growth with some randomness
-        growth_factor = 1 + (i * 0.08) + random.uniform(-0.05, 0.1)
-        customers = int(base_customers * growth_factor)
-        
-        # MRR calculation with variance
-        mrr = base_mrr * growth_factor * random.uniform(0.95, 1.05)
-        
-        # Churn increases slightly with size
-        churn_rate = min(0.05 + (i * 0.002), 0.08)
-        churn_count = int(customers * churn_rate * random.uniform(0.8, 1.2))
-        
-        # New customers = growth + churn replacement
-        if i > 0:
-            prev_customers = data[i-1]['customer_count']
-            new_customers = max(customers - prev_customers + churn_count, 0)
-        else:
-            new_customers = int(customers * 0.15)
-        
-        data.append({
-            'month': month_date.strftime('%Y-%m-01'),
-            'mrr': round(mrr, 2),
-            'customer_count': customers,
-            'churn_count': churn_count,
-            'new_customers': new_customers
-        })
-    
-    return data
+    idx = np.arange(months)
+    
+    # Growth with some randomness
+    growth_factor = 1 + (idx * 0.08) + rng.uniform(-0.05, 0.1, months)
+    customers = (base_customers * growth_factor).astype(int)
+    
+    # MRR calculation with variance
+    mrr = base_mrr * growth_factor * rng.uniform(0.95, 1.05, months)
+    
+    # Churn increases slightly with size
+    churn_rate = np.minimum(0.05 + (idx * 0.002), 0.08)
+    churn_count = (customers * churn_rate * rng.uniform(0.8, 1.2, months)).astype(int)
+    
+    # New customers = growth + churn replacement
+    new_customers = np.maximum(np.diff(customers, prepend=customers[:1]) + churn_count, 0)
+    if months > 0:
+        new_customers[0] = int(customers[0] * 0.15)
+    
+    return pd.DataFrame({
+        'month': month_strs,
+        'mrr': mrr.round(2),
+        'customer_count': customers,
+        'churn_count': churn_count,
+        'new_customers': new_customers
+    }).to_dict('records')
 
 def generate_plan_data(monthly_data):
     """Generate revenue breakdown by plan tier."""
-    plan_data = []
+    months = np.array([m['month'] for m in monthly_data])
+    total_customers = np.array([m['customer_count'] for m in monthly_data], dtype=int)
+    total_mrr = np.array([m['mrr'] for m in monthly_data], dtype=float)
     
-    for month_data in monthly_data:
-        total_customers = month_data['customer_count']
-        total_mrr = month_data['mrr']
-        
-        # Distribution: 50% starter, 35% pro, 15% enterprise
-        starter_customers = int(total_customers * 0.50)
-        pro_customers = int(total_customers * 0.35)
-        enterprise_customers = total_customers - starter_customers - pro_customers
-        
-        # Calculate revenue (with some variance from ideal)
-        starter_revenue = starter_customers * PLAN_PRICES['starter'] * random.uniform(0.95, 1.05)
-        pro_revenue = pro_customers * PLAN_PRICES['pro'] * random.uniform(0.95, 1.05)
-        enterprise_revenue = enterprise_customers * PLAN_PRICES['enterprise'] * random.uniform(0.95, 1.05)
-        
-        # Normalize to match total MRR
-        total_calc = starter_revenue + pro_revenue + enterprise_revenue
-        if total_calc > 0:
-            ratio = total_mrr / total_calc
-            starter_revenue *= ratio
-            pro_revenue *= ratio
-            enterprise_revenue *= ratio
-        
-        plan_data.extend([
-            {
-                'month': month_data['month'],
-                'plan_tier': 'starter',
-                'revenue': round(starter_revenue, 2),
-                'customer_count': starter_customers
-            },
-            {
-                'month': month_data['month'],
-                'plan_tier': 'pro',
-                'revenue': round(pro_revenue, 2),
-                'customer_count': pro_customers
-            },
-            {
-                'month': month_data['month'],
-                'plan_tier': 'enterprise',
-                'revenue': round(enterprise_revenue, 2),
-                'customer_count': enterprise_customers
-            }
-        ])
-    
-    return plan_data
+    # Distribution: 50% starter, 35% pro, 15% enterprise
+    starter_customers = (total_customers * 0.50).astype(int)
+    pro_customers = (total_customers * 0.35).astype(int)
+    enterprise_customers = total_customers - starter_customers - pro_customers
+    customers = np.stack([starter_customers, pro_customers, enterprise_customers])
+    
+    # Calculate revenue (with some variance from ideal)
+    prices = np.array([PLAN_PRICES['starter'], PLAN_PRICES['pro'], PLAN_PRICES['enterprise']])
+    revenue = customers * prices[:, None] * rng.uniform(0.95, 1.05, (3, len(months)))
+    
+    # Normalize to match total MRR
+    total_calc = revenue.sum(axis=0)
+    ratio = np.divide(total_mrr, total_calc, out=np.ones_like(total_mrr), where=total_calc > 0)
+    revenue *= ratio
+    
+    return pd.DataFrame({
+        'month': np.tile(months, 3),
+        'plan_tier': np.repeat(['starter', 'pro', 'enterprise'], len(months)),
+        'revenue': revenue.ravel().round(2),
+        'customer_count': customers.ravel()
+    }).to_dict('records')
 
 def generate_cohort_data(months=6):
     """Generate cohort retention data."""
     cohort_data = []
     
     # Start 6 months ago for cohorts
-    start_date = datetime.now() - relativedelta(months=months-1)
+    start_date = datetime.now().replace(day=1) - relativedelta(months=months-1)
+    cohort_month_strs = pd.date_range(start_date.date(), periods=months, freq='MS').strftime('%Y-%m-01').to_numpy()
+    
+    # Initial cohort sizes and retention noise, drawn in bulk
+    initial_sizes = rng.integers(20, 51, months)
+    noise = rng.uniform(0, 5, (months, 6))
     
     for cohort_idx in range(months):
-        cohort_month = start_date + relativedelta(months=cohort_idx)
-        cohort_month_str = cohort_month.strftime('%Y-%m-01')
+        cohort_month_str = cohort_month_strs[cohort_idx]
         
         # Initial cohort size
-        initial_customers = random.randint(20, 50)
+        initial_customers = int(initial_sizes[cohort_idx])
         
         # Generate retention for up to 6 months
         max_months = min(6, months - cohort_idx)
@@ -139,7 +132,7 @@ def generate_cohort_data(months=6):
         for month_num in range(max_months):
             # Retention curve: starts high, decreases over time
             # Month 0: 100%, Month 1: ~85%, Month 2: ~75%, etc.
-            base_retention = 100 - (month_num * 8) - random.uniform(0, 5)
+            base_retention = 100 - (month_num * 8) - float(noise[cohort_idx, month_num])
             base_retention = max(base_retention, 60)  # Floor at 60%
             
             customers_remaining = int(initial_customers * (base_retention / 100))
@@ -153,6 +146,51 @@ def generate_cohort_data(months=6):
     
     return cohort_data
 
+def _chunked(rows, n=INSERT_BATCH_SIZE):
+    """Yield successive n-sized slices of rows."""
+    for i in range(0, len(rows), n):
+        yield rows[i:i + n]
+
+def insert_tables(supabase, tables):
+    """Insert rows into several tables using concurrent, batched requests.
+    
+    Args:
+        supabase: Supabase client
+        tables: Mapping of table name -> list of row dicts
+    """
+    with ThreadPoolExecutor(max_workers=INSERT_WORKERS) as executor:
+        futures = [
+            executor.submit(supabase.table(table).insert(chunk).execute)
+            for table, rows in tables.items()
+            for chunk in _chunked(rows)
+        ]
+        # Surface the first failure, if any
+        for future in futures:
+            future.result()
+
+def copy_tables(dsn, tables):
+    """Replace the contents of several tables using Postgres COPY.
+    
+    Much faster than JSON inserts through PostgREST for large seeds. Runs the
+    truncate and all COPYs in one transaction over a direct connection.
+    
+    Args:
+        dsn: Postgres connection string (SUPABASE_DB_URL)
+        tables: Mapping of table name -> list of row dicts
+    """
+    import psycopg
+    
+    with psycopg.connect(dsn) as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT reset_saas_tables()")
+            for table, rows in tables.items():
+                if not rows:
+                    continue
+                columns = list(rows[0])
+                with cur.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+                    for row in rows:
+                        copy.write_row([row[col] for col in columns])
+
 def seed_database():
     """Main function to seed the database."""
     print("🌱 Starting database seeding...")
@@ -171,23 +209,25 @@ def seed_database():
         print(f"  - {len(plan_data)} plan breakdown records")
         print(f"  - {len(cohort_data)} cohort retention records")
         
-        # Clear existing data
-        print("\n🧹 Clearing existing data...")
-        supabase.table("monthly_revenue").delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
-        supabase.table("revenue_by_plan").delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
-        supabase.table("cohort_retention").delete().neq('id', '00000000-0000-0000-0000-000000000000').execute()
-        
-        # Insert new data
-        print("\n💾 Inserting data...")
-        
-        print("  - Monthly revenue...")
-        supabase.table("monthly_revenue").insert(monthly_data).execute()
-        
-        print("  - Revenue by plan...")
-        supabase.table("revenue_by_plan").insert(plan_data).execute()
-        
-        print("  - Cohort retention...")
-        supabase.table("cohort_retention").insert(cohort_data).execute()
+        tables = {
+            "monthly_revenue": monthly_data,
+            "revenue_by_plan": plan_data,
+            "cohort_retention": cohort_data
+        }
+        
+        db_url = os.getenv("SUPABASE_DB_URL")
+        if db_url:
+            # Direct Postgres connection available: bulk load with COPY
+            print("\n💾 Replacing data via COPY...")
+            copy_tables(db_url, tables)
+        else:
+            # Clear existing data
+            print("\n🧹 Clearing existing data...")
+            supabase.rpc("reset_saas_tables").execute()
+            
+            # Insert new data
+            print("\n💾 Inserting data...")
+            insert_tables(supabase, tables)
         
         print("\n✨ Database seeded successfully!")
         print("\n📈 Sample metrics from latest month:")
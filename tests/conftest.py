@@ -2,7 +2,130 @@
 
 import pytest
 import sys
+from contextlib import nullcontext
 from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import Mock
+from datetime import datetime, timedelta
 
 # Add parent directory to path so we can import utils
 sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+@pytest.fixture(autouse=True)
+def clear_ai_response_cache():
+    """Start every test with an empty Claude response cache."""
+    from utils.ai_insights import _response_cache
+    _response_cache.clear()
+    yield
+    _response_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_session_cache():
+    """Start every test with an empty restored-session cache."""
+    from utils.auth import _session_cache
+    _session_cache.clear()
+    yield
+    _session_cache.clear()
+
+
+# ============================================================================
+# CLIENT MOCKS
+# ============================================================================
+# Building the nested mocks is the slowest part of test setup, so each one is
+# built once per session and reset (call records only, configured return
+# values kept) before every test that uses it.
+
+@pytest.fixture(scope="session")
+def _supabase_proto():
+    """Mock Supabase client with auth and data methods, built once per session."""
+    client = Mock()
+    
+    # Mock auth responses
+    mock_user = Mock()
+    mock_user.id = "test-user-123"
+    mock_user.email = "test@example.com"
+    
+    mock_session = Mock()
+    mock_session.access_token = "test-access-token-abc123"
+    mock_session.refresh_token = "test-refresh-token-xyz789"
+    mock_session.expires_at = int((datetime.now() + timedelta(hours=1)).timestamp())
+    
+    # Mock auth methods
+    client.auth.sign_up.return_value = Mock(user=mock_user, session=mock_session)
+    client.auth.sign_in_with_password.return_value = Mock(user=mock_user, session=mock_session)
+    client.auth.set_session.return_value = Mock(user=mock_user, session=mock_session)
+    client.auth.sign_out.return_value = None
+    
+    # Mock data queries
+    mock_revenue_data = [
+        {
+            'month': (datetime.now() - timedelta(days=30*i)).strftime('%Y-%m-01'),
+            'mrr': 50000 + (i * 1000),
+            'customer_count': 100 + (i * 5),
+            'new_customers': 10,
+            'churn_count': 2
+        }
+        for i in range(6)
+    ]
+    
+    mock_plan_data = [
+        {'plan_tier': 'Basic', 'revenue': 10000, 'customer_count': 50},
+        {'plan_tier': 'Pro', 'revenue': 30000, 'customer_count': 40},
+        {'plan_tier': 'Enterprise', 'revenue': 15000, 'customer_count': 10}
+    ]
+    
+    # Mock table queries - filter/modifier methods chain back to the same builder
+    query = Mock()
+    for method in ('select', 'order', 'limit', 'gte', 'in_', 'eq'):
+        getattr(query, method).return_value = query
+    query.execute.return_value.data = mock_revenue_data
+    client.table.return_value = query
+    
+    # Mock current_metrics() RPC (one pre-computed row, as a single object)
+    client.rpc.return_value.single.return_value.execute.return_value.data = {
+        'mrr': 50000,
+        'mrr_growth': -1.96,
+        'customers': 100,
+        'customer_growth': -4.76,
+        'churn_rate': 2.0,
+        'new_customers': 10
+    }
+    
+    return client
+
+
+@pytest.fixture(scope="session")
+def _anthropic_proto():
+    """Mock Anthropic Claude API client, built once per session.
+    
+    Built from spec_set mocks and plain namespaces so attribute access never
+    auto-creates child MagicMocks; only messages.stream records calls.
+    """
+    text = "Your SaaS metrics show healthy growth with MRR increasing 15% month-over-month. Customer acquisition is strong, and churn remains low at 2%. Focus on expanding your Enterprise tier for maximum revenue impact."
+    
+    # messages.stream() yields the reply split into a few text deltas
+    chunks = [text[i:i + 60] for i in range(0, len(text), 60)]
+    
+    client = Mock(spec_set=['messages'])
+    client.messages = Mock(spec_set=['stream'])
+    client.messages.stream = Mock(
+        side_effect=lambda **kwargs: nullcontext(SimpleNamespace(text_stream=iter(chunks)))
+    )
+    
+    return client
+
+
+@pytest.fixture
+def mock_supabase_client(_supabase_proto):
+    """Mock Supabase client with auth and data methods."""
+    _supabase_proto.reset_mock()
+    return _supabase_proto
+
+
+@pytest.fixture
+def mock_anthropic_client(_anthropic_proto):
+    """Mock Anthropic Claude API client."""
+    _anthropic_proto.reset_mock()
+    return _anthropic_proto
@@ -11,7 +11,7 @@ Tests cover:
 """
 
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, DEFAULT
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
@@ -22,66 +22,6 @@ import json
 # FIXTURES
 # ============================================================================
 
-@pytest.fixture
-def mock_supabase_client():
-    """Mock Supabase client with auth and data methods."""
-    client = Mock()
-    
-    # Mock auth responses
-    mock_user = Mock()
-    mock_user.id = "test-user-123"
-    mock_user.email = "test@example.com"
-    
-    mock_session = Mock()
-    mock_session.access_token = "test-access-token-abc123"
-    mock_session.refresh_token = "test-refresh-token-xyz789"
-    
-    # Mock auth methods
-    client.auth.sign_up.return_value = Mock(user=mock_user, session=mock_session)
-    client.auth.sign_in_with_password.return_value = Mock(user=mock_user, session=mock_session)
-    client.auth.set_session.return_value = Mock(user=mock_user, session=mock_session)
-    client.auth.sign_out.return_value = None
-    
-    # Mock data queries
-    mock_revenue_data = [
-        {
-            'month': (datetime.now() - timedelta(days=30*i)).strftime('%Y-%m-01'),
-            'mrr': 50000 + (i * 1000),
-            'customer_count': 100 + (i * 5),
-            'new_customers': 10,
-            'churn_count': 2
-        }
-        for i in range(6)
-    ]
-    
-    mock_plan_data = [
-        {'plan_tier': 'Basic', 'revenue': 10000, 'customer_count': 50},
-        {'plan_tier': 'Pro', 'revenue': 30000, 'customer_count': 40},
-        {'plan_tier': 'Enterprise', 'revenue': 15000, 'customer_count': 10}
-    ]
-    
-    # Mock table queries
-    client.table.return_value.select.return_value.execute.return_value.data = mock_revenue_data
-    
-    return client
-
-
-@pytest.fixture
-def mock_anthropic_client():
-    """Mock Anthropic Claude API client."""
-    client = Mock()
-    
-    # Mock message response
-    mock_message = Mock()
-    mock_content = Mock()
-    mock_content.text = "Your SaaS metrics show healthy growth with MRR increasing 15% month-over-month. Customer acquisition is strong, and churn remains low at 2%. Focus on expanding your Enterprise tier for maximum revenue impact."
-    mock_message.content = [mock_content]
-    
-    client.messages.create.return_value = mock_message
-    
-    return client
-
-
 @pytest.fixture
 def sample_metrics():
     """Sample SaaS metrics for testing."""
@@ -120,10 +60,29 @@ def sample_plan_df():
     return pd.DataFrame(data)
 
 
+class _SessionState(dict):
+    """Dict with attribute access, like st.session_state."""
+    
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+    
+    def __setattr__(self, name, value):
+        self[name] = value
+    
+    def __delattr__(self, name):
+        try:
+            del self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+
 @pytest.fixture
 def mock_streamlit_session():
     """Mock Streamlit session state."""
-    session = {}
+    session = _SessionState()
     with patch.object(st, 'session_state', session):
         yield session
 
@@ -133,7 +92,7 @@ def mock_streamlit_session():
 # ============================================================================
 
 @patch('utils.auth.get_supabase_client')
-@patch('utils.auth._save_session_to_storage')
+@patch('utils.auth._save_session_params')
 def test_signup_flow_success(mock_save_storage, mock_get_client, mock_supabase_client, mock_streamlit_session):
     """Test successful user signup flow."""
     from utils.auth import signup
@@ -184,7 +143,7 @@ def test_signup_flow_failure(mock_get_client, mock_streamlit_session):
 # ============================================================================
 
 @patch('utils.auth.get_supabase_client')
-@patch('utils.auth._save_session_to_storage')
+@patch('utils.auth._save_session_params')
 def test_login_flow_success(mock_save_storage, mock_get_client, mock_supabase_client, mock_streamlit_session):
     """Test successful user login flow."""
     from utils.auth import login
@@ -239,8 +198,8 @@ def test_login_flow_invalid_credentials(mock_get_client, mock_streamlit_session)
 # ============================================================================
 
 @patch('utils.auth.get_supabase_client')
-@patch('utils.auth._load_session_from_storage')
-@patch('utils.auth._save_session_to_storage')
+@patch('utils.auth._load_session_params')
+@patch('utils.auth._save_session_params')
 def test_session_restore_from_localstorage(
     mock_save_storage,
     mock_load_storage,
@@ -252,10 +211,7 @@ def test_session_restore_from_localstorage(
     from utils.auth import check_stored_session
     
     # Setup - simulate existing session in localStorage
-    mock_load_storage.return_value = {
-        'access_token': 'stored-access-token',
-        'refresh_token': 'stored-refresh-token'
-    }
+    mock_load_storage.return_value = ('stored-access-token', 'stored-refresh-token')
     mock_get_client.return_value = mock_supabase_client
     mock_save_storage.return_value = True
     
@@ -277,8 +233,64 @@ def test_session_restore_from_localstorage(
     assert mock_streamlit_session['_session_check_done'] is True
 
 
-@patch('utils.auth._load_session_from_storage')
-@patch('utils.auth._clear_session_storage')
+@patch('utils.auth.get_supabase_client')
+@patch('utils.auth._load_session_params')
+@patch('utils.auth._save_session_params')
+def test_session_restore_reuses_recent_restore(
+    mock_save_storage,
+    mock_load_storage,
+    mock_get_client,
+    mock_supabase_client,
+    mock_streamlit_session
+):
+    """Test that reloading with the refreshed tokens skips set_session."""
+    from utils.auth import check_stored_session
+    
+    mock_load_storage.return_value = ('stored-access-token', 'stored-refresh-token')
+    mock_get_client.return_value = mock_supabase_client
+    
+    assert check_stored_session() is True
+    
+    # Simulate a page reload: fresh session state, URL now holds the refreshed tokens
+    mock_streamlit_session.clear()
+    mock_load_storage.return_value = ('test-access-token-abc123', 'test-refresh-token-xyz789')
+    assert check_stored_session() is True
+    
+    mock_supabase_client.auth.set_session.assert_called_once()
+    assert mock_streamlit_session['authenticated'] is True
+
+
+@patch('utils.auth.get_supabase_client')
+@patch('utils.auth._load_session_params')
+@patch('utils.auth._save_session_params')
+def test_session_restore_cache_requires_current_tokens(
+    mock_save_storage,
+    mock_load_storage,
+    mock_get_client,
+    mock_supabase_client,
+    mock_streamlit_session
+):
+    """Test that pre-rotation or mismatched tokens always go back to Supabase."""
+    from utils.auth import check_stored_session
+    
+    mock_load_storage.return_value = ('stored-access-token', 'stored-refresh-token')
+    mock_get_client.return_value = mock_supabase_client
+    assert check_stored_session() is True
+    
+    # An old link from history still carries the pre-rotation tokens
+    mock_streamlit_session.clear()
+    check_stored_session()
+    
+    # The refreshed refresh token with some other access token
+    mock_streamlit_session.clear()
+    mock_load_storage.return_value = ('forged-access-token', 'test-refresh-token-xyz789')
+    check_stored_session()
+    
+    assert mock_supabase_client.auth.set_session.call_count == 3
+
+
+@patch('utils.auth._load_session_params')
+@patch('utils.auth._clear_session_params')
 def test_session_restore_no_stored_session(
     mock_clear_storage,
     mock_load_storage,
@@ -288,7 +300,7 @@ def test_session_restore_no_stored_session(
     from utils.auth import check_stored_session
     
     # Setup - no stored session
-    mock_load_storage.return_value = None
+    mock_load_storage.return_value = (None, None)
     
     # Execute session check
     result = check_stored_session()
@@ -299,8 +311,8 @@ def test_session_restore_no_stored_session(
 
 
 @patch('utils.auth.get_supabase_client')
-@patch('utils.auth._load_session_from_storage')
-@patch('utils.auth._clear_session_storage')
+@patch('utils.auth._load_session_params')
+@patch('utils.auth._clear_session_params')
 def test_session_restore_expired_token(
     mock_clear_storage,
     mock_load_storage,
@@ -311,10 +323,7 @@ def test_session_restore_expired_token(
     from utils.auth import check_stored_session
     
     # Setup - simulate expired token
-    mock_load_storage.return_value = {
-        'access_token': 'expired-token',
-        'refresh_token': 'expired-refresh'
-    }
+    mock_load_storage.return_value = ('expired-token', 'expired-refresh')
     
     mock_client = Mock()
     mock_client.auth.set_session.side_effect = Exception("Token expired")
@@ -333,14 +342,10 @@ def test_session_restore_expired_token(
 # TEST 4: DASHBOARD DATA LOADING
 # ============================================================================
 
-@patch('utils.database.get_supabase_client')
-def test_dashboard_data_loading(mock_get_client, mock_supabase_client):
+def test_dashboard_data_loading(mock_supabase_client):
     """Test dashboard data loading after authentication."""
     from utils.database import get_monthly_revenue, get_current_metrics
     
-    # Setup
-    mock_get_client.return_value = mock_supabase_client
-    
     # Test monthly revenue loading
     revenue_df = get_monthly_revenue(mock_supabase_client, months=6)
     assert len(revenue_df) > 0
@@ -353,6 +358,74 @@ def test_dashboard_data_loading(mock_get_client, mock_supabase_client):
     assert 'mrr' in metrics
 
 
+def test_plan_revenue_window_follows_latest_month():
+    """Test that the plan revenue window is anchored on the data, not the clock."""
+    from utils.database import get_revenue_by_plan
+    
+    # Setup - data last seeded well over a year ago
+    query = Mock()
+    for method in ('select', 'order', 'limit', 'gte'):
+        getattr(query, method).return_value = query
+    query.execute.return_value.data = [
+        {'month': '2024-06-01', 'plan_tier': 'Pro', 'revenue': 33000, 'customer_count': 45}
+    ]
+    client = Mock()
+    client.table.return_value = query
+    
+    plan_df = get_revenue_by_plan(client, months=12)
+    
+    # Same 12 months as get_monthly_revenue's latest 12 rows
+    query.gte.assert_called_once_with("month", "2023-07-01")
+    assert len(plan_df) == 1
+
+
+@pytest.fixture
+def clear_data_cache():
+    """Run with empty st.cache_data loaders."""
+    st.cache_data.clear()
+    yield
+    st.cache_data.clear()
+
+
+@patch('utils.database.get_client')
+def test_dashboard_data_loading_concurrent(mock_get_client, mock_supabase_client, clear_data_cache):
+    """Test that load_datasets fetches just the requested datasets in one call."""
+    from utils.data_loaders import load_datasets
+    
+    mock_get_client.return_value = mock_supabase_client
+    
+    metrics, revenue_df, plan_df = load_datasets("metrics", "revenue", "plans", months=6)
+    
+    assert len(revenue_df) > 0
+    assert isinstance(plan_df, pd.DataFrame)
+    assert 'mrr' in metrics
+    queried = {call.args[0] for call in mock_supabase_client.table.call_args_list}
+    assert queried == {'monthly_revenue', 'revenue_by_plan'}
+
+
+@patch('utils.database.get_client')
+def test_dashboard_data_failure_not_cached(mock_get_client, mock_supabase_client, clear_data_cache):
+    """Test that a failed query is reported on every rerun and retried, not cached."""
+    from utils.data_loaders import load_datasets
+    
+    failing = Mock()
+    failing.table.side_effect = Exception("boom")
+    mock_get_client.return_value = failing
+    
+    with patch.object(st, 'error') as mock_error:
+        # Two reruns while Supabase is down: each one shows the error
+        for _ in range(2):
+            revenue_df, = load_datasets("revenue", months=6)
+            assert revenue_df.empty
+        assert mock_error.call_count == 2
+        assert "Error fetching revenue data: boom" in mock_error.call_args.args[0]
+    
+    # Once Supabase is back, the next rerun fetches instead of serving the failure
+    mock_get_client.return_value = mock_supabase_client
+    revenue_df, = load_datasets("revenue", months=6)
+    assert len(revenue_df) > 0
+
+
 # ============================================================================
 # TEST 5: AI INSIGHTS GENERATION
 # ============================================================================
@@ -368,7 +441,7 @@ def test_ai_insights_generation_success(
     from utils.ai_insights import generate_executive_summary
     
     # Setup
-    mock_get_claude.return_value = mock_anthropic_client
+    mock_get_claude.return_value = (mock_anthropic_client, None)
     
     # Execute
     summary = generate_executive_summary(sample_metrics, sample_revenue_df)
@@ -379,18 +452,42 @@ def test_ai_insights_generation_success(
     assert "growth" in summary.lower() or "revenue" in summary.lower()
     
     # Check API was called
-    mock_anthropic_client.messages.create.assert_called_once()
-    call_args = mock_anthropic_client.messages.create.call_args
+    mock_anthropic_client.messages.stream.assert_called_once()
+    call_args = mock_anthropic_client.messages.stream.call_args
     assert call_args.kwargs['model'] == "claude-sonnet-4-20250514"
 
 
+@patch('utils.ai_insights.get_claude_client')
+def test_ai_summary_cached_for_unchanged_metrics(
+    mock_get_claude,
+    mock_anthropic_client,
+    sample_metrics,
+    sample_revenue_df
+):
+    """Test that reruns with identical metrics reuse the cached summary."""
+    from utils.ai_insights import generate_executive_summary
+    
+    # Setup
+    mock_get_claude.return_value = (mock_anthropic_client, None)
+    
+    # Execute - simulate two Streamlit reruns, then a metrics change
+    first = generate_executive_summary(sample_metrics, sample_revenue_df)
+    second = generate_executive_summary(sample_metrics, sample_revenue_df)
+    assert first == second
+    assert mock_anthropic_client.messages.stream.call_count == 1
+    
+    changed_metrics = {**sample_metrics, 'mrr': 60000}
+    generate_executive_summary(changed_metrics, sample_revenue_df)
+    assert mock_anthropic_client.messages.stream.call_count == 2
+
+
 @patch('utils.ai_insights.get_claude_client')
 def test_ai_insights_no_api_key(mock_get_claude, sample_metrics, sample_revenue_df):
     """Test AI insights graceful degradation without API key."""
     from utils.ai_insights import generate_executive_summary
     
     # Setup - no API client
-    mock_get_claude.return_value = None
+    mock_get_claude.return_value = (None, None)
     
     # Execute
     summary = generate_executive_summary(sample_metrics, sample_revenue_df)
@@ -398,7 +495,23 @@ def test_ai_insights_no_api_key(mock_get_claude, sample_metrics, sample_revenue_
     # Assertions
     assert summary is not None
     assert "Unavailable" in summary or "unavailable" in summary
-    assert str(sample_metrics['mrr']) in summary  # Should show basic metrics
+    assert f"{sample_metrics['mrr']:,}" in summary  # Should show basic metrics
+
+
+@patch('utils.ai_insights.get_claude_client')
+def test_ai_summary_skips_api_without_data(mock_get_claude, mock_anthropic_client, sample_metrics):
+    """Test that an empty dashboard gets a local summary without calling Claude."""
+    from utils.ai_insights import generate_executive_summary
+    
+    # Setup
+    mock_get_claude.return_value = (mock_anthropic_client, None)
+    
+    # Execute - no revenue history yet
+    summary = generate_executive_summary(sample_metrics, pd.DataFrame())
+    
+    # Assertions
+    assert "Not Enough Data" in summary
+    mock_anthropic_client.messages.stream.assert_not_called()
 
 
 @patch('utils.ai_insights.get_claude_client')
@@ -413,7 +526,7 @@ def test_ai_question_answering(
     from utils.ai_insights import answer_metric_question
     
     # Setup
-    mock_get_claude.return_value = mock_anthropic_client
+    mock_get_claude.return_value = (mock_anthropic_client, None)
     
     # Execute
     answer = answer_metric_question(
@@ -428,20 +541,108 @@ def test_ai_question_answering(
     assert len(answer) > 0
     
     # Check API was called with question
-    mock_anthropic_client.messages.create.assert_called_once()
+    mock_anthropic_client.messages.stream.assert_called_once()
+
+
+@patch('utils.ai_insights.get_claude_client')
+def test_ai_dashboard_insights_concurrent(
+    mock_get_claude,
+    mock_anthropic_client,
+    sample_metrics,
+    sample_revenue_df,
+    sample_plan_df
+):
+    """Test generating the summary and an answer in one concurrent call."""
+    from utils.ai_insights import generate_dashboard_insights
+    
+    # Setup
+    mock_get_claude.return_value = (mock_anthropic_client, None)
+    
+    # Execute
+    summary, answer = generate_dashboard_insights(
+        sample_metrics,
+        sample_revenue_df,
+        sample_plan_df,
+        "How is my churn rate trending?"
+    )
+    
+    # Assertions
+    assert summary and answer
+    assert mock_anthropic_client.messages.stream.call_count == 2
+
+
+@patch('utils.ai_insights.get_claude_client')
+def test_ai_summary_streaming(
+    mock_get_claude,
+    mock_anthropic_client,
+    sample_metrics,
+    sample_revenue_df
+):
+    """Test that the streamed summary arrives in chunks and is cached for reruns."""
+    from utils.ai_insights import stream_executive_summary
+    
+    # Setup
+    mock_get_claude.return_value = (mock_anthropic_client, None)
+    
+    # Execute - first render streams the reply as it arrives
+    chunks = list(stream_executive_summary(sample_metrics, sample_revenue_df))
+    assert len(chunks) > 1
+    assert "".join(chunks).startswith("Your SaaS metrics show healthy growth")
+    
+    # A rerun with unchanged metrics is one cached chunk, no second API call
+    assert list(stream_executive_summary(sample_metrics, sample_revenue_df)) == ["".join(chunks)]
+    mock_anthropic_client.messages.stream.assert_called_once()
 
 
 @patch('utils.ai_insights.get_claude_client')
-def test_ai_insights_oauth_token_detection(mock_get_claude):
+def test_ai_answer_stream_error_replaces_partial_text(
+    mock_get_claude,
+    sample_metrics,
+    sample_revenue_df,
+    sample_plan_df
+):
+    """Test that a stream failing midway renders only the error, not partial text."""
+    from utils.ai_insights import answer_metric_question, stream_metric_answer, _response_cache
+    from app import _render_stream
+    from contextlib import nullcontext
+    
+    # Setup - every stream drops after the first chunk
+    def text_stream():
+        yield "Par"
+        raise ConnectionError("net down")
+    
+    client = Mock()
+    client.messages.stream.side_effect = lambda **kwargs: nullcontext(Mock(text_stream=text_stream()))
+    mock_get_claude.return_value = (client, None)
+    
+    # Execute
+    rendered = []
+    text = _render_stream(
+        rendered.append,
+        stream_metric_answer("How is churn trending?", sample_metrics, sample_revenue_df, sample_plan_df)
+    )
+    
+    # Assertions - the partial reply is shown, then replaced by the error
+    assert rendered == ["Par", "⚠️ Error generating answer: net down"]
+    assert text == "⚠️ Error generating answer: net down"
+    assert not _response_cache
+    
+    # The blocking wrapper keeps just the error too
+    answer = answer_metric_question("How is churn trending?", sample_metrics, sample_revenue_df, sample_plan_df)
+    assert answer == "⚠️ Error generating answer: net down"
+
+
+def test_ai_insights_oauth_token_detection():
     """Test that OAuth tokens are properly detected and rejected."""
     from utils.ai_insights import get_claude_client
     
     # Setup - simulate OAuth token in environment
     with patch.dict('os.environ', {'ANTHROPIC_API_KEY': 'sk-ant-oat01-xxxxx'}):
-        client = get_claude_client()
+        client, reason = get_claude_client()
         
-        # Should return None and show warning
+        # Should return no client and a reason for the caller to show
         assert client is None
+        assert "OAuth token" in reason
 
 
 # ============================================================================
@@ -449,10 +650,10 @@ def test_ai_insights_oauth_token_detection(mock_get_claude):
 # ============================================================================
 
 @patch('utils.auth.get_supabase_client')
-@patch('utils.auth._clear_session_storage')
+@patch('utils.auth._clear_session_params')
 def test_logout_and_cleanup(mock_clear_storage, mock_get_client, mock_supabase_client, mock_streamlit_session):
     """Test logout flow and session cleanup."""
-    from utils.auth import logout
+    from utils.auth import logout, _sign_out_executor
     
     # Setup - simulate authenticated session
     mock_streamlit_session['authenticated'] = True
@@ -472,28 +673,85 @@ def test_logout_and_cleanup(mock_clear_storage, mock_get_client, mock_supabase_c
     assert 'access_token' not in mock_streamlit_session
     assert 'refresh_token' not in mock_streamlit_session
     
-    # Check Supabase sign_out was called
-    mock_supabase_client.auth.sign_out.assert_called_once()
+    # Check the session was revoked server-side (it runs on a background worker)
+    _sign_out_executor.submit(lambda: None).result()
+    mock_supabase_client.auth.admin.sign_out.assert_called_once_with("token123")
     
     # Check localStorage was cleared
     mock_clear_storage.assert_called_once()
 
 
+@patch('utils.auth.get_supabase_client')
+@patch('utils.auth._load_session_params')
+@patch('utils.auth._clear_session_params')
+@patch('utils.auth._save_session_params')
+def test_logout_evicts_restored_session(
+    mock_save_storage,
+    mock_clear_storage,
+    mock_load_storage,
+    mock_get_client,
+    mock_supabase_client,
+    mock_streamlit_session
+):
+    """Test that logout stops a cached restore from logging the URL back in."""
+    from utils.auth import check_stored_session, logout, _sign_out_executor
+    
+    # Setup - URL holds pre-refresh tokens; set_session returns refreshed ones
+    mock_load_storage.return_value = ('old-access-token', 'old-refresh-token')
+    mock_get_client.return_value = mock_supabase_client
+    
+    assert check_stored_session() is True
+    
+    # A reload served from the restore cache, then logout from that session
+    mock_streamlit_session.clear()
+    mock_load_storage.return_value = ('test-access-token-abc123', 'test-refresh-token-xyz789')
+    assert check_stored_session() is True
+    mock_supabase_client.auth.set_session.assert_called_once()
+    logout()
+    
+    # The cached restore's access token is still revoked server-side
+    _sign_out_executor.submit(lambda: None).result()
+    mock_supabase_client.auth.admin.sign_out.assert_called_once_with("test-access-token-abc123")
+    
+    # Reopening the same URL goes back to Supabase instead of the cache
+    mock_streamlit_session.clear()
+    check_stored_session()
+    assert mock_supabase_client.auth.set_session.call_count == 2
+
+
+# ============================================================================
+# TEST 7: DEPLOYMENT VERIFICATION
+# ============================================================================
+
+@pytest.mark.parametrize("anthropic_key, expected", [
+    ("sk-ant-api03-xxxxx", True),
+    ("your_anthropic_api_key", False),
+])
+def test_verify_env_with_env_file(tmp_path, monkeypatch, anthropic_key, expected):
+    """Test verify_env against a present .env file."""
+    import verify
+    
+    # Setup - .env in a scratch working directory
+    (tmp_path / ".env").write_text(
+        "# Supabase Configuration\n"
+        "SUPABASE_URL=https://project.supabase.co\n"
+        "SUPABASE_KEY=anon-key\n"
+        f"ANTHROPIC_API_KEY={anthropic_key}\n"
+    )
+    monkeypatch.chdir(tmp_path)
+    verify.files_in.cache_clear()
+    
+    try:
+        assert verify.verify_env() is expected
+    finally:
+        verify.files_in.cache_clear()
+
+
 # ============================================================================
 # INTEGRATION TEST: FULL USER JOURNEY
 # ============================================================================
 
-@patch('utils.auth.get_supabase_client')
-@patch('utils.auth._save_session_to_storage')
-@patch('utils.auth._load_session_from_storage')
-@patch('utils.auth._clear_session_storage')
-@patch('utils.ai_insights.get_claude_client')
 def test_full_user_journey(
-    mock_get_claude,
-    mock_clear_storage,
-    mock_load_storage,
-    mock_save_storage,
-    mock_get_client,
     mock_supabase_client,
     mock_anthropic_client,
     mock_streamlit_session,
@@ -504,40 +762,47 @@ def test_full_user_journey(
     from utils.auth import signup, check_stored_session, logout, check_authentication
     from utils.ai_insights import generate_executive_summary
     
-    # Setup mocks
-    mock_get_client.return_value = mock_supabase_client
-    mock_save_storage.return_value = True
-    mock_get_claude.return_value = mock_anthropic_client
-    
-    # Step 1: User signs up
-    signup_result = signup("journey@example.com", "password123")
-    assert signup_result is True
-    assert check_authentication() is True
-    
-    # Step 2: Session is saved to localStorage
-    mock_save_storage.assert_called()
-    
-    # Step 3: Simulate page refresh - session should restore
-    mock_streamlit_session.clear()
-    mock_streamlit_session['_session_check_done'] = False
-    mock_load_storage.return_value = {
-        'access_token': 'test-access-token-abc123',
-        'refresh_token': 'test-refresh-token-xyz789'
-    }
-    
-    restored = check_stored_session()
-    assert restored is True
-    assert check_authentication() is True
-    
-    # Step 4: User views AI insights
-    summary = generate_executive_summary(sample_metrics, sample_revenue_df)
-    assert summary is not None
-    assert len(summary) > 0
-    
-    # Step 5: User logs out
-    logout()
-    assert check_authentication() is False
-    mock_clear_storage.assert_called_once()
+    # One patcher for all auth helpers instead of a stack of decorators
+    with patch.multiple(
+        'utils.auth',
+        get_supabase_client=DEFAULT,
+        _save_session_params=DEFAULT,
+        _load_session_params=DEFAULT,
+        _clear_session_params=DEFAULT
+    ) as auth_mocks, patch('utils.ai_insights.get_claude_client') as mock_get_claude:
+        # Setup mocks
+        auth_mocks['get_supabase_client'].return_value = mock_supabase_client
+        mock_get_claude.return_value = (mock_anthropic_client, None)
+        
+        # Step 1: User signs up
+        signup_result = signup("journey@example.com", "password123")
+        assert signup_result is True
+        assert check_authentication() is True
+        
+        # Step 2: Session is saved to query params
+        auth_mocks['_save_session_params'].assert_called()
+        
+        # Step 3: Simulate page refresh - session should restore
+        mock_streamlit_session.clear()
+        mock_streamlit_session['_session_check_done'] = False
+        auth_mocks['_load_session_params'].return_value = (
+            'test-access-token-abc123',
+            'test-refresh-token-xyz789'
+        )
+        
+        restored = check_stored_session()
+        assert restored is True
+        assert check_authentication() is True
+        
+        # Step 4: User views AI insights
+        summary = generate_executive_summary(sample_metrics, sample_revenue_df)
+        assert summary is not None
+        assert len(summary) > 0
+        
+        # Step 5: User logs out
+        logout()
+        assert check_authentication() is False
+        auth_mocks['_clear_session_params'].assert_called_once()
 
 
 if __name__ == "__main__":
@@ -1,99 +1,353 @@
 """AI-powered insights using Claude API."""
-import os
-from anthropic import Anthropic
-import streamlit as st
-from typing import Dict, Optional
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterator, Optional, Tuple
+import numpy as np
 import pandas as pd
 
-def get_claude_client() -> Optional[Anthropic]:
+from utils.config import get_env
+
+# The anthropic SDK (httpx, pydantic models) is imported on first use in
+# _http_client/_build_client rather than at module load
+if TYPE_CHECKING:
+    from anthropic import Anthropic
+
+
+# Static instructions sent as the system prompt, marked for Anthropic prompt
+# caching; only the per-request data goes in the user message.
+_SUMMARY_SYSTEM = (
+    "You are a SaaS analytics assistant. Based on the SaaS metrics provided, "
+    "write a brief executive summary (3-4 sentences). "
+    "Focus on: overall health, key trends, and one actionable insight."
+)
+_QUESTION_SYSTEM = (
+    "You are a SaaS analytics assistant. Answer the user's question based on "
+    "the data provided. Provide a concise, actionable answer (2-3 sentences max)."
+)
+
+# Completed replies keyed by (system, prompt, max_tokens) -> (stored_at, text).
+# st.cache_data can't memoize a generator, so this small TTL/LRU cache is
+# kept by hand.
+_RESPONSE_TTL = 3600
+_RESPONSE_MAX_ENTRIES = 256
+_response_cache: "OrderedDict[Tuple[str, str, int], Tuple[float, str]]" = OrderedDict()
+_response_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def _http_client():
+    """Shared keep-alive HTTP/2 pool for all Claude requests.
+    
+    Newer SDK releases bundle their own httpx build, so the client, Limits
+    and Timeout all come from the SDK rather than httpx.
+    """
+    from anthropic import DefaultHttpxClient, DEFAULT_CONNECTION_LIMITS, Timeout
+    
+    return DefaultHttpxClient(
+        http2=True,
+        limits=type(DEFAULT_CONNECTION_LIMITS)(
+            max_keepalive_connections=20,
+            max_connections=100,
+            keepalive_expiry=30.0
+        ),
+        timeout=Timeout(30.0, connect=5.0)
+    )
+
+@lru_cache(maxsize=4)
+def _build_client(api_key: str) -> "Anthropic":
+    """Create (once per API key) the Anthropic client on the shared HTTP pool."""
+    from anthropic import Anthropic
+    
+    return Anthropic(api_key=api_key, http_client=_http_client())
+
+def get_claude_client() -> Tuple[Optional["Anthropic"], Optional[str]]:
     """Initialize Claude API client with proper error handling.
     
+    Has no Streamlit side effects; the caller decides whether and where to
+    show the returned reason.
+    
     Returns:
-        Anthropic client if valid API key, None otherwise.
+        (client, None) if valid API key, otherwise (None, reason) where reason
+        is a user-facing message, or None when no key is configured at all.
     
     Note:
         OAuth tokens (sk-ant-oat01-*) from Claude Max subscriptions do NOT work
         as regular API keys. Only standard API keys (sk-ant-api03-*) are supported.
     """
-    api_key = os.getenv("ANTHROPIC_API_KEY")
+    api_key = get_env("ANTHROPIC_API_KEY")
     if not api_key:
-        return None
+        return None, None
     
     # Check if this is an OAuth token (not supported for API access)
     if api_key.startswith("sk-ant-oat01-"):
-        st.warning(
+        return None, (
             "⚠️ **AI Insights Unavailable**: The configured API key is a Claude Max "
             "OAuth token, which cannot be used for API access. To enable AI insights, "
             "please obtain a standard Anthropic API key from https://console.anthropic.com/"
         )
-        return None
     
     try:
-        return Anthropic(api_key=api_key)
+        return _build_client(api_key), None
     except Exception as e:
-        st.error(f"⚠️ Failed to initialize Claude API client: {str(e)}")
-        return None
+        return None, f"⚠️ Failed to initialize Claude API client: {str(e)}"
 
-def generate_executive_summary(metrics: Dict, revenue_df: pd.DataFrame) -> str:
-    """Generate an AI-powered executive summary of current metrics.
+def _get_cached_response(key: Tuple[str, str, int]) -> Optional[str]:
+    """Return a cached reply for key if present and not expired."""
+    with _response_lock:
+        entry = _response_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, text = entry
+        if time.monotonic() - stored_at > _RESPONSE_TTL:
+            del _response_cache[key]
+            return None
+        _response_cache.move_to_end(key)
+        return text
+
+def _store_response(key: Tuple[str, str, int], text: str):
+    """Cache a completed reply, evicting the least recently used entry."""
+    with _response_lock:
+        _response_cache[key] = (time.monotonic(), text)
+        _response_cache.move_to_end(key)
+        while len(_response_cache) > _RESPONSE_MAX_ENTRIES:
+            _response_cache.popitem(last=False)
+
+def _request_kwargs(system: str, prompt: str, max_tokens: int) -> Dict:
+    """Build messages API arguments with a prompt-cached system block."""
+    return dict(
+        model="claude-sonnet-4-20250514",  # Latest Sonnet model
+        max_tokens=max_tokens,
+        system=[
+            {"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}
+        ],
+        messages=[
+            {"role": "user", "content": prompt}
+        ]
+    )
+
+class ReplaceText(str):
+    """Streamed chunk that replaces the text so far rather than extending it."""
+
+def _stream_claude(client: "Anthropic", system: str, prompt: str, max_tokens: int) -> Iterator[str]:
+    """Send a single-turn prompt to Claude, yielding reply text as it arrives.
     
-    Args:
-        metrics: Dictionary of current SaaS metrics
-        revenue_df: DataFrame with historical revenue data
-        
-    Returns:
-        AI-generated executive summary or helpful fallback message
+    Cached on (system, prompt, max_tokens): the prompt embeds the question
+    and the metrics it was built from, so identical questions against
+    unchanged data skip the API call and the reply is yielded in one piece.
+    The completed text is cached once the stream finishes; failed streams
+    raise and are not cached.
     """
-    client = get_claude_client()
-    if not client:
+    key = (system, prompt, max_tokens)
+    cached = _get_cached_response(key)
+    if cached is not None:
+        yield cached
+        return
+    
+    chunks = []
+    with client.messages.stream(**_request_kwargs(system, prompt, max_tokens)) as stream:
+        for text in stream.text_stream:
+            chunks.append(text)
+            yield text
+    _store_response(key, "".join(chunks))
+
+def _collect_stream(chunks: Iterator[str]) -> str:
+    """Join streamed chunks into the final text; a ReplaceText chunk supersedes what came before."""
+    text = ""
+    for chunk in chunks:
+        text = chunk if isinstance(chunk, ReplaceText) else text + chunk
+    return text
+
+def _is_auth_error(error: Exception) -> bool:
+    """Whether an API error means the key is invalid or expired."""
+    error_msg = str(error).lower()
+    return "invalid x-api-key" in error_msg or "authentication" in error_msg
+
+def _summary_unavailable(metrics: Dict) -> str:
+    """Fallback executive summary when no Claude client is configured."""
+    return (
+        "💡 **AI Insights Unavailable**\n\n"
+        "To enable AI-powered insights, configure a valid Anthropic API key. "
+        "In the meantime, you can analyze your metrics using the charts and data tables above.\n\n"
+        f"**Quick Summary**: Your MRR is ${metrics.get('mrr', 0):,.2f} with "
+        f"{metrics.get('customers', 0):,} customers and a {metrics.get('churn_rate', 0):.1f}% churn rate."
+    )
+
+def _local_summary(metrics: Dict) -> str:
+    """Executive summary rendered locally when there's too little data for Claude to add anything."""
+    return (
+        "📊 **Not Enough Data Yet**\n\n"
+        "There isn't enough revenue history for an AI summary. Once monthly revenue "
+        "data is available, this section will highlight trends and opportunities.\n\n"
+        f"**Quick Summary**: Your MRR is ${metrics.get('mrr', 0):,.2f} with "
+        f"{metrics.get('customers', 0):,} customers."
+    )
+
+def _has_summary_data(metrics: Dict, revenue_df: pd.DataFrame) -> bool:
+    """Whether the metrics are substantial enough to be worth an API call."""
+    return not revenue_df.empty and bool(metrics.get('mrr'))
+
+def _summary_error(error: Exception, metrics: Dict) -> str:
+    """User-facing message for a failed executive summary call."""
+    # Provide helpful fallback with error details
+    if _is_auth_error(error):
         return (
-            "💡 **AI Insights Unavailable**\n\n"
-            "To enable AI-powered insights, configure a valid Anthropic API key. "
-            "In the meantime, you can analyze your metrics using the charts and data tables above.\n\n"
+            "⚠️ **Authentication Error**: The API key is invalid or expired. "
+            "Please check your Anthropic API key configuration.\n\n"
             f"**Quick Summary**: Your MRR is ${metrics.get('mrr', 0):,.2f} with "
-            f"{metrics.get('customers', 0):,} customers and a {metrics.get('churn_rate', 0):.1f}% churn rate."
+            f"{metrics.get('customers', 0):,} customers."
         )
-    
-    # Prepare context for Claude
-    context = f"""
-Based on the following SaaS metrics, provide a brief executive summary (3-4 sentences):
+    return f"⚠️ Error generating AI summary: {str(error)}"
+
+# Prompt tables are formatted by hand: DataFrame.to_string runs pandas' full
+# column-width formatter, which is heavy for a 3-6 row excerpt.
+
+def _tail_columns(df: pd.DataFrame, columns: Tuple[str, ...], n: int) -> list:
+    """Return the last n values of each column as NumPy views (no frame copy)."""
+    return [df[column].to_numpy()[-n:] for column in columns]
+
+def _month_labels(months: np.ndarray) -> np.ndarray:
+    """Format month values as YYYY-MM-DD strings in one vectorized pass."""
+    return months.astype('datetime64[D]').astype(str)
+
+def _format_mrr_trend(df: pd.DataFrame, n: int) -> str:
+    """Render the last n month/MRR rows for a prompt."""
+    months, mrr = _tail_columns(df, ('month', 'mrr'), n)
+    return "month mrr\n" + "\n".join(
+        f"{month} {value:.2f}" for month, value in zip(_month_labels(months), mrr)
+    )
+
+def _format_revenue_history(df: pd.DataFrame, n: int) -> str:
+    """Render the last n month/MRR/customer rows for a prompt."""
+    months, mrr, customers = _tail_columns(df, ('month', 'mrr', 'customer_count'), n)
+    return "month mrr customer_count\n" + "\n".join(
+        f"{month} {value:.2f} {count}" for month, value, count in zip(_month_labels(months), mrr, customers)
+    )
+
+def _format_plan_revenue(df: pd.DataFrame, n: int) -> str:
+    """Render the last n plan tier revenue rows for a prompt."""
+    tiers, revenue, customers = _tail_columns(df, ('plan_tier', 'revenue', 'customer_count'), n)
+    return "plan_tier revenue customer_count\n" + "\n".join(
+        f"{tier} {value:.2f} {count}" for tier, value, count in zip(tiers, revenue, customers)
+    )
 
+_SUMMARY_TEMPLATE = """
 Current Metrics:
-- MRR: ${metrics.get('mrr', 0):,.2f} ({metrics.get('mrr_growth', 0):+.1f}% vs last month)
-- Customers: {metrics.get('customers', 0):,} ({metrics.get('customer_growth', 0):+.1f}% growth)
-- Churn Rate: {metrics.get('churn_rate', 0):.1f}%
-- New Customers: {metrics.get('new_customers', 0)}
+- MRR: ${mrr:,.2f} ({mrr_growth:+.1f}% vs last month)
+- Customers: {customers:,} ({customer_growth:+.1f}% growth)
+- Churn Rate: {churn_rate:.1f}%
+- New Customers: {new_customers}
 
 Recent Trend (last 3 months MRR):
-{revenue_df.tail(3)[['month', 'mrr']].to_string(index=False) if not revenue_df.empty else 'No data'}
+{trend}
+"""
+
+_QUESTION_TEMPLATE = """
+Current Metrics:
+- MRR: ${mrr:,.2f} (Growth: {mrr_growth:+.1f}%)
+- Customers: {customers:,} (Growth: {customer_growth:+.1f}%)
+- Churn Rate: {churn_rate:.1f}%
+- New Customers This Month: {new_customers}
+
+Monthly Revenue History:
+{history}
+
+Revenue by Plan (latest month):
+{plans}
 
-Focus on: overall health, key trends, and one actionable insight.
+User Question: {question}
 """
+
+# Values used for metrics missing from the metrics dict
+_METRIC_DEFAULTS = {
+    'mrr': 0,
+    'mrr_growth': 0,
+    'customers': 0,
+    'customer_growth': 0,
+    'churn_rate': 0,
+    'new_customers': 0,
+}
+
+def _summary_prompt(metrics: Dict, revenue_df: pd.DataFrame) -> str:
+    """Build the executive summary user message (instructions are in _SUMMARY_SYSTEM)."""
+    return _SUMMARY_TEMPLATE.format_map({
+        **_METRIC_DEFAULTS,
+        **metrics,
+        'trend': _format_mrr_trend(revenue_df, 3) if not revenue_df.empty else 'No data',
+    })
+
+def _answer_unavailable() -> str:
+    """Fallback Q&A reply when no Claude client is configured."""
+    return (
+        "💡 **AI Insights Unavailable**\n\n"
+        "To enable AI-powered Q&A, configure a valid Anthropic API key. "
+        "You can still explore your metrics using the charts and data tables in the dashboard."
+    )
+
+def _answer_error(error: Exception) -> str:
+    """User-facing message for a failed Q&A call."""
+    if _is_auth_error(error):
+        return (
+            "⚠️ **Authentication Error**: Unable to access AI insights. "
+            "Please verify your Anthropic API key configuration."
+        )
+    return f"⚠️ Error generating answer: {str(error)}"
+
+def _question_prompt(question: str, metrics: Dict, revenue_df: pd.DataFrame, plan_df: pd.DataFrame) -> str:
+    """Build the metrics Q&A user message (instructions are in _QUESTION_SYSTEM)."""
+    return _QUESTION_TEMPLATE.format_map({
+        **_METRIC_DEFAULTS,
+        **metrics,
+        'history': _format_revenue_history(revenue_df, 6) if not revenue_df.empty else 'No data',
+        'plans': _format_plan_revenue(plan_df, 3) if not plan_df.empty else 'No data',
+        'question': question,
+    })
+
+def generate_executive_summary(metrics: Dict, revenue_df: pd.DataFrame) -> str:
+    """Generate an AI-powered executive summary of current metrics.
+    
+    Collects stream_executive_summary, so the blocking and streaming calls
+    share one request and cache path.
+    
+    Args:
+        metrics: Dictionary of current SaaS metrics
+        revenue_df: DataFrame with historical revenue data
+        
+    Returns:
+        AI-generated executive summary or helpful fallback message
+    """
+    return _collect_stream(stream_executive_summary(metrics, revenue_df))
+
+def stream_executive_summary(metrics: Dict, revenue_df: pd.DataFrame) -> Iterator[str]:
+    """Streaming variant of generate_executive_summary for st.write_stream-style rendering.
+    
+    Yields:
+        Chunks of the executive summary (or a single fallback message); an
+        error is yielded as a ReplaceText that supersedes any partial reply
+    """
+    # Fast path: nothing for Claude to analyze yet
+    if not _has_summary_data(metrics, revenue_df):
+        yield _local_summary(metrics)
+        return
+    
+    client, _ = get_claude_client()
+    if not client:
+        yield _summary_unavailable(metrics)
+        return
     
     try:
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",  # Latest Sonnet model
-            max_tokens=300,
-            messages=[
-                {"role": "user", "content": context}
-            ]
-        )
-        return message.content[0].text
+        yield from _stream_claude(client, _SUMMARY_SYSTEM, _summary_prompt(metrics, revenue_df), max_tokens=300)
     except Exception as e:
-        # Provide helpful fallback with error details
-        error_msg = str(e)
-        if "invalid x-api-key" in error_msg.lower() or "authentication" in error_msg.lower():
-            return (
-                "⚠️ **Authentication Error**: The API key is invalid or expired. "
-                "Please check your Anthropic API key configuration.\n\n"
-                f"**Quick Summary**: Your MRR is ${metrics.get('mrr', 0):,.2f} with "
-                f"{metrics.get('customers', 0):,} customers."
-            )
-        return f"⚠️ Error generating AI summary: {error_msg}"
+        # The stream may already have yielded part of a reply
+        yield ReplaceText(_summary_error(e, metrics))
 
 def answer_metric_question(question: str, metrics: Dict, revenue_df: pd.DataFrame, plan_df: pd.DataFrame) -> str:
     """Answer natural language questions about metrics using AI.
     
+    Collects stream_metric_answer, so the blocking and streaming calls share
+    one request and cache path.
+    
     Args:
         question: Natural language question about metrics
         metrics: Dictionary of current SaaS metrics
@@ -103,49 +357,47 @@ def answer_metric_question(question: str, metrics: Dict, revenue_df: pd.DataFram
     Returns:
         AI-generated answer or helpful fallback message
     """
-    client = get_claude_client()
-    if not client:
-        return (
-            "💡 **AI Insights Unavailable**\n\n"
-            "To enable AI-powered Q&A, configure a valid Anthropic API key. "
-            "You can still explore your metrics using the charts and data tables in the dashboard."
-        )
-    
-    # Prepare data context
-    context = f"""
-You are a SaaS analytics assistant. Answer the user's question based on this data:
-
-Current Metrics:
-- MRR: ${metrics.get('mrr', 0):,.2f} (Growth: {metrics.get('mrr_growth', 0):+.1f}%)
-- Customers: {metrics.get('customers', 0):,} (Growth: {metrics.get('customer_growth', 0):+.1f}%)
-- Churn Rate: {metrics.get('churn_rate', 0):.1f}%
-- New Customers This Month: {metrics.get('new_customers', 0)}
-
-Monthly Revenue History:
-{revenue_df[['month', 'mrr', 'customer_count']].tail(6).to_string(index=False) if not revenue_df.empty else 'No data'}
-
-Revenue by Plan (latest month):
-{plan_df.tail(3)[['plan_tier', 'revenue', 'customer_count']].to_string(index=False) if not plan_df.empty else 'No data'}
+    return _collect_stream(stream_metric_answer(question, metrics, revenue_df, plan_df))
 
-User Question: {question}
-
-Provide a concise, actionable answer (2-3 sentences max).
-"""
+def stream_metric_answer(question: str, metrics: Dict, revenue_df: pd.DataFrame, plan_df: pd.DataFrame) -> Iterator[str]:
+    """Streaming variant of answer_metric_question.
+    
+    Yields:
+        Chunks of the answer (or a single fallback message); an error is
+        yielded as a ReplaceText that supersedes any partial reply
+    """
+    client, _ = get_claude_client()
+    if not client:
+        yield _answer_unavailable()
+        return
     
     try:
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",  # Latest Sonnet model
-            max_tokens=200,
-            messages=[
-                {"role": "user", "content": context}
-            ]
-        )
-        return message.content[0].text
+        yield from _stream_claude(client, _QUESTION_SYSTEM, _question_prompt(question, metrics, revenue_df, plan_df), max_tokens=200)
     except Exception as e:
-        error_msg = str(e)
-        if "invalid x-api-key" in error_msg.lower() or "authentication" in error_msg.lower():
-            return (
-                "⚠️ **Authentication Error**: Unable to access AI insights. "
-                "Please verify your Anthropic API key configuration."
-            )
-        return f"⚠️ Error generating answer: {error_msg}"
+        # The stream may already have yielded part of a reply
+        yield ReplaceText(_answer_error(e))
+
+def generate_dashboard_insights(
+    metrics: Dict,
+    revenue_df: pd.DataFrame,
+    plan_df: pd.DataFrame,
+    question: str
+) -> Tuple[str, str]:
+    """Generate the executive summary and answer a question concurrently.
+    
+    Both requests go out together on the shared HTTP pool, so the total wait
+    is roughly the slower of the two calls rather than their sum.
+    
+    Args:
+        metrics: Dictionary of current SaaS metrics
+        revenue_df: DataFrame with historical revenue data
+        plan_df: DataFrame with plan-level revenue data
+        question: Natural language question about metrics
+        
+    Returns:
+        Tuple of (executive summary, answer)
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        summary = executor.submit(generate_executive_summary, metrics, revenue_df)
+        answer = executor.submit(answer_metric_question, question, metrics, revenue_df, plan_df)
+        return summary.result(), answer.result()
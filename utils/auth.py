@@ -4,28 +4,57 @@ Uses st.query_params to persist a session token across page refreshes.
 This is the only client-side storage mechanism in Streamlit that is
 available synchronously on the first render (no JS component needed).
 
-The refresh_token is stored as a query parameter. On page load, it's used
-to restore the Supabase session. This is secure enough for a demo since:
+The access and refresh tokens are stored as two query parameters. Supabase
+tokens are already URL-safe, so they are stored as-is. On page load, they're
+used to restore the Supabase session. This is secure enough for a demo since:
 - Refresh tokens are short-lived and rotatable
 - The token is only in the URL, not stored in browser storage
 - Supabase validates the token server-side
 """
 import streamlit as st
 from supabase import create_client, Client
-import os
-from dotenv import load_dotenv
-import base64
+import hashlib
+import hmac
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
 
-load_dotenv()
+from utils.config import get_env
 
-# Query param key for session persistence
-SESSION_PARAM_KEY = "s"
+logger = logging.getLogger(__name__)
 
+# Query param keys for session persistence
+ACCESS_TOKEN_PARAM = "at"
+REFRESH_TOKEN_PARAM = "rt"
 
-def get_supabase_client() -> Client:
-    """Initialize and return Supabase client."""
-    url = os.getenv("SUPABASE_URL")
-    key = os.getenv("SUPABASE_KEY")
+
+# Session state key holding this browser session's Supabase client
+CLIENT_STATE_KEY = "_supabase_client"
+
+# Session state key memoizing the tokens read from the query params
+TOKENS_STATE_KEY = "_session_tokens"
+
+# Seconds a restored session may be reused for the same refresh token
+SESSION_CACHE_TTL = 300
+
+# Restored (user, session) pairs shared across browser sessions, so a page
+# reload within the TTL skips the set_session round-trip. Keyed by a SHA-256
+# of the refreshed refresh token so raw tokens aren't kept as dict keys. Only
+# the tokens Supabase issued are cached: a URL still carrying pre-rotation
+# tokens always goes back to Supabase.
+_session_cache: Dict[str, Tuple[float, Any, Any]] = {}
+_session_cache_lock = threading.Lock()
+
+# Background worker for server-side sign-outs
+_sign_out_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="supabase-sign-out")
+
+
+def _create_supabase_client() -> Client:
+    """Initialize a new Supabase client from environment credentials."""
+    url = get_env("SUPABASE_URL")
+    key = get_env("SUPABASE_KEY")
     
     if not url or not key:
         st.error("⚠️ Supabase credentials not found. Please check your .env file.")
@@ -34,59 +63,116 @@ def get_supabase_client() -> Client:
     return create_client(url, key)
 
 
-def _encode_tokens(access_token: str, refresh_token: str) -> str:
-    """Encode tokens for URL storage."""
-    combined = f"{access_token}|{refresh_token}"
-    return base64.urlsafe_b64encode(combined.encode()).decode()
+def get_supabase_client() -> Client:
+    """Return the Supabase client for the current session.
+    
+    The client is built once and kept in st.session_state, so Streamlit
+    reruns reuse its HTTP connection pool. It is deliberately not an
+    st.cache_resource singleton: the client carries the signed-in user's
+    auth session, which must not be shared between browser sessions.
+    """
+    client = st.session_state.get(CLIENT_STATE_KEY)
+    if client is None:
+        client = _create_supabase_client()
+        st.session_state[CLIENT_STATE_KEY] = client
+    return client
+
 
+def _session_cache_key(refresh_token: str) -> str:
+    """Hash a refresh token into a session cache key."""
+    return hashlib.sha256(refresh_token.encode()).hexdigest()
 
-def _decode_tokens(encoded: str) -> tuple:
-    """Decode tokens from URL storage.
+
+def _get_cached_session(access_token: str, refresh_token: str) -> Optional[Tuple[Any, Any]]:
+    """Return a still-valid cached (user, session) for the token pair, or None.
     
-    Returns:
-        Tuple of (access_token, refresh_token) or (None, None) on error
+    Both tokens must match the cached session, so a stale or forged access
+    token falls through to set_session.
     """
-    try:
-        decoded = base64.urlsafe_b64decode(encoded.encode()).decode()
-        parts = decoded.split("|", 1)
-        if len(parts) == 2:
-            return parts[0], parts[1]
-    except Exception:
-        pass
-    return None, None
+    key = _session_cache_key(refresh_token)
+    now = time.time()
+    with _session_cache_lock:
+        entry = _session_cache.get(key)
+        if entry is None:
+            return None
+        stored_at, user, session = entry
+        expires_at = getattr(session, "expires_at", None)
+        if now - stored_at >= SESSION_CACHE_TTL or (expires_at is not None and expires_at <= now):
+            del _session_cache[key]
+            return None
+    if not hmac.compare_digest(session.access_token, access_token):
+        return None
+    return user, session
+
+
+def _store_session(user: Any, session: Any):
+    """Cache a restored session under its (refreshed) refresh token."""
+    now = time.time()
+    with _session_cache_lock:
+        for key, (stored_at, _, _) in list(_session_cache.items()):
+            if now - stored_at >= SESSION_CACHE_TTL:
+                del _session_cache[key]
+        _session_cache[_session_cache_key(session.refresh_token)] = (now, user, session)
+
+
+def _forget_session(refresh_token: Optional[str]):
+    """Drop the cached session for refresh_token, if any."""
+    if refresh_token:
+        with _session_cache_lock:
+            _session_cache.pop(_session_cache_key(refresh_token), None)
 
 
 def _save_session_params(access_token: str, refresh_token: str):
-    """Save session tokens to query params."""
+    """Save session tokens to query params.
+    
+    Skips the write when the params already hold these tokens, since each
+    query param update is pushed to the browser.
+    """
     try:
-        encoded = _encode_tokens(access_token, refresh_token)
-        st.query_params[SESSION_PARAM_KEY] = encoded
+        params = st.query_params
+        if params.get(ACCESS_TOKEN_PARAM) == access_token and params.get(REFRESH_TOKEN_PARAM) == refresh_token:
+            return
+        st.session_state.pop(TOKENS_STATE_KEY, None)
+        params.update({ACCESS_TOKEN_PARAM: access_token, REFRESH_TOKEN_PARAM: refresh_token})
     except Exception as e:
-        print(f"[Session] Save params error: {e}")
+        logger.debug("Session save params error: %s", e)
 
 
 def _load_session_params() -> tuple:
     """Load session tokens from query params.
     
+    The tokens are memoized in session state, so reruns don't re-read the
+    params until they are saved or cleared.
+    
     Returns:
         Tuple of (access_token, refresh_token) or (None, None)
     """
+    cached = st.session_state.get(TOKENS_STATE_KEY)
+    if cached is not None:
+        return cached
+    
+    tokens = None, None
     try:
-        encoded = st.query_params.get(SESSION_PARAM_KEY)
-        if encoded:
-            return _decode_tokens(encoded)
+        access_token = st.query_params.get(ACCESS_TOKEN_PARAM)
+        refresh_token = st.query_params.get(REFRESH_TOKEN_PARAM)
+        if access_token and refresh_token:
+            tokens = access_token, refresh_token
     except Exception as e:
-        print(f"[Session] Load params error: {e}")
-    return None, None
+        logger.debug("Session load params error: %s", e)
+    
+    st.session_state[TOKENS_STATE_KEY] = tokens
+    return tokens
 
 
 def _clear_session_params():
     """Clear session tokens from query params."""
+    st.session_state.pop(TOKENS_STATE_KEY, None)
     try:
-        if SESSION_PARAM_KEY in st.query_params:
-            del st.query_params[SESSION_PARAM_KEY]
+        for key in (ACCESS_TOKEN_PARAM, REFRESH_TOKEN_PARAM):
+            if key in st.query_params:
+                del st.query_params[key]
     except Exception as e:
-        print(f"[Session] Clear params error: {e}")
+        logger.debug("Session clear params error: %s", e)
 
 
 def login(email: str, password: str) -> bool:
@@ -164,14 +250,36 @@ def signup(email: str, password: str) -> bool:
         return False
 
 
+def _sign_out(supabase: Client, access_token: Optional[str]):
+    """Revoke the session server-side; runs on _sign_out_executor.
+    
+    Revokes with the access token from session state rather than
+    supabase.auth.sign_out(), which only revokes when the client itself
+    holds a session: a restore served from _session_cache never calls
+    set_session on the client.
+    """
+    if not access_token:
+        return
+    try:
+        supabase.auth.admin.sign_out(access_token)
+    except Exception as e:
+        logger.debug("Session sign out error: %s", e)
+
+
 def logout():
     """Logout current user and clear session.
     
-    Clears both Streamlit session state and URL query params.
+    Clears both Streamlit session state and URL query params right away and
+    sends the server-side sign-out in the background, so the UI doesn't wait
+    on the network. The session's client is dropped so a new login starts on
+    a fresh one instead of racing the pending sign-out.
     """
     try:
+        _forget_session(st.session_state.get("refresh_token"))
+        access_token = st.session_state.get("access_token")
+        
         supabase = get_supabase_client()
-        supabase.auth.sign_out()
+        st.session_state.pop(CLIENT_STATE_KEY, None)
         
         # Clear Streamlit session state
         st.session_state.authenticated = False
@@ -184,6 +292,8 @@ def logout():
         # Clear URL query params
         _clear_session_params()
         
+        _sign_out_executor.submit(_sign_out, supabase, access_token)
+        
     except Exception as e:
         st.error(f"Logout failed: {str(e)}")
 
@@ -192,19 +302,23 @@ def check_stored_session() -> bool:
     """Check for stored session in query params and restore if valid.
     
     This is called on page load to restore authentication from URL params.
-    Works synchronously — no JS component rendering needed.
+    Works synchronously — no JS component rendering needed. Already
+    authenticated or already checked sessions return straight from session
+    state; only a cold session goes on to _restore_stored_session.
     
     Returns:
         True if session was restored, False otherwise
     """
-    # Skip if already authenticated
-    if st.session_state.get("authenticated"):
+    state = st.session_state
+    if state.get("authenticated"):
         return True
-    
-    # Skip if we already tried
-    if st.session_state.get("_session_check_done"):
+    if state.get("_session_check_done"):
         return False
-    
+    return _restore_stored_session()
+
+
+def _restore_stored_session() -> bool:
+    """Restore the Supabase session from the tokens in the query params."""
     # Load tokens from query params
     access_token, refresh_token = _load_session_params()
     
@@ -212,25 +326,32 @@ def check_stored_session() -> bool:
         st.session_state._session_check_done = True
         return False
     
-    # Try to restore the session with stored tokens
+    # Try to restore the session with stored tokens, reusing a recent
+    # restore when the URL holds exactly the tokens it issued
     try:
-        supabase = get_supabase_client()
-        
-        response = supabase.auth.set_session(access_token, refresh_token)
+        cached = _get_cached_session(access_token, refresh_token)
+        if cached is not None:
+            user, session = cached
+        else:
+            supabase = get_supabase_client()
+            response = supabase.auth.set_session(access_token, refresh_token)
+            user, session = response.user, response.session
+            if user and session:
+                _store_session(user, session)
         
-        if response.user and response.session:
+        if user and session:
             # Restore session state
-            st.session_state.user = response.user
+            st.session_state.user = user
             st.session_state.authenticated = True
-            st.session_state.access_token = response.session.access_token
-            st.session_state.refresh_token = response.session.refresh_token
+            st.session_state.access_token = session.access_token
+            st.session_state.refresh_token = session.refresh_token
             st.session_state._session_check_done = True
             
             # Update query params with refreshed tokens if changed
-            if response.session.access_token != access_token:
+            if session.access_token != access_token:
                 _save_session_params(
-                    response.session.access_token,
-                    response.session.refresh_token
+                    session.access_token,
+                    session.refresh_token
                 )
             
             return True
@@ -240,7 +361,7 @@ def check_stored_session() -> bool:
             return False
             
     except Exception as e:
-        print(f"[Session] Restore error: {e}")
+        logger.debug("Session restore error: %s", e)
         _clear_session_params()
         st.session_state._session_check_done = True
         return False
@@ -0,0 +1,18 @@
+"""Shared helpers for Streamlit caching."""
+import pandas as pd
+
+
+def hash_dataframe(df: pd.DataFrame) -> bytes:
+    """Content hash of a DataFrame (columns, values and index) for st.cache_data keys."""
+    columns = "\x1f".join(map(str, df.columns)).encode()
+    return columns + pd.util.hash_pandas_object(df, index=True).values.tobytes()
+
+
+# Seconds a cached chart or display table is kept. These are pure functions
+# of their input frame, so the TTL only evicts entries for data that has
+# since been refreshed, which would otherwise pile up.
+CHART_CACHE_TTL = 600
+
+
+# Pass as hash_funcs= to st.cache_data for functions taking DataFrames
+DATAFRAME_HASH_FUNCS = {pd.DataFrame: hash_dataframe}
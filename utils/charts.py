@@ -2,15 +2,36 @@
 import plotly.graph_objects as go
 import plotly.express as px
 import pandas as pd
+import numpy as np
+import streamlit as st
+from pandas.io.formats.style import Styler
 from typing import Optional
 
+from utils.cache import CHART_CACHE_TTL, DATAFRAME_HASH_FUNCS
+
+# Shared layout settings, built once instead of per chart call
+_BASE_LAYOUT = dict(
+    height=400,
+    plot_bgcolor='rgba(0,0,0,0)',
+    paper_bgcolor='rgba(0,0,0,0)',
+    font=dict(color='#E0E0E0')
+)
+_GRID_AXIS = dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)')
+_TIME_SERIES_LAYOUT = dict(
+    _BASE_LAYOUT,
+    hovermode='x unified',
+    xaxis=_GRID_AXIS,
+    yaxis=_GRID_AXIS
+)
+
+@st.cache_data(ttl=CHART_CACHE_TTL, show_spinner=False, hash_funcs=DATAFRAME_HASH_FUNCS)
 def create_mrr_chart(df: pd.DataFrame) -> Optional[go.Figure]:
     """Create MRR trend line chart."""
     if df.empty:
         return None
     
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
+    fig.add_trace(go.Scattergl(
         x=df['month'],
         y=df['mrr'],
         mode='lines+markers',
@@ -25,24 +46,19 @@ def create_mrr_chart(df: pd.DataFrame) -> Optional[go.Figure]:
         title='Monthly Recurring Revenue Trend',
         xaxis_title='Month',
         yaxis_title='MRR ($)',
-        hovermode='x unified',
-        height=400,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#E0E0E0'),
-        xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)'),
-        yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)')
+        **_TIME_SERIES_LAYOUT
     )
     
     return fig
 
+@st.cache_data(ttl=CHART_CACHE_TTL, show_spinner=False, hash_funcs=DATAFRAME_HASH_FUNCS)
 def create_customer_chart(df: pd.DataFrame) -> Optional[go.Figure]:
     """Create customer count trend chart."""
     if df.empty:
         return None
     
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
+    fig.add_trace(go.Scattergl(
         x=df['month'],
         y=df['customer_count'],
         mode='lines+markers',
@@ -55,29 +71,27 @@ def create_customer_chart(df: pd.DataFrame) -> Optional[go.Figure]:
         title='Customer Growth',
         xaxis_title='Month',
         yaxis_title='Total Customers',
-        hovermode='x unified',
-        height=400,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#E0E0E0'),
-        xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)'),
-        yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)')
+        **_TIME_SERIES_LAYOUT
     )
     
     return fig
 
+@st.cache_data(ttl=CHART_CACHE_TTL, show_spinner=False, hash_funcs=DATAFRAME_HASH_FUNCS)
 def create_churn_chart(df: pd.DataFrame) -> Optional[go.Figure]:
     """Create churn rate visualization."""
     if df.empty:
         return None
     
-    # Calculate churn rate
-    df['churn_rate'] = (df['churn_count'] / df['customer_count'] * 100).round(2)
+    # Calculate churn rate on plain arrays; the input frame is left untouched
+    churn_rate = np.round(
+        df['churn_count'].to_numpy(dtype=np.float64) / df['customer_count'].to_numpy(dtype=np.float64) * 100.0,
+        2
+    )
     
     fig = go.Figure()
     fig.add_trace(go.Bar(
         x=df['month'],
-        y=df['churn_rate'],
+        y=churn_rate,
         name='Churn Rate',
         marker=dict(color='#FF5252')
     ))
@@ -86,17 +100,12 @@ def create_churn_chart(df: pd.DataFrame) -> Optional[go.Figure]:
         title='Monthly Churn Rate',
         xaxis_title='Month',
         yaxis_title='Churn Rate (%)',
-        hovermode='x unified',
-        height=400,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#E0E0E0'),
-        xaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)'),
-        yaxis=dict(showgrid=True, gridcolor='rgba(255,255,255,0.1)')
+        **_TIME_SERIES_LAYOUT
     )
     
     return fig
 
+@st.cache_data(ttl=CHART_CACHE_TTL, show_spinner=False, hash_funcs=DATAFRAME_HASH_FUNCS)
 def create_plan_revenue_chart(df: pd.DataFrame) -> Optional[go.Figure]:
     """Create revenue breakdown by plan tier."""
     if df.empty:
@@ -116,30 +125,46 @@ def create_plan_revenue_chart(df: pd.DataFrame) -> Optional[go.Figure]:
     
     fig.update_layout(
         title='Revenue by Plan Tier (Current Month)',
-        height=400,
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        font=dict(color='#E0E0E0')
+        **_BASE_LAYOUT
     )
     
     return fig
 
+@st.cache_data(ttl=CHART_CACHE_TTL, show_spinner=False, hash_funcs=DATAFRAME_HASH_FUNCS)
 def create_cohort_retention_table(df: pd.DataFrame) -> Optional[pd.DataFrame]:
     """Create cohort retention pivot table."""
     if df.empty:
         return None
     
-    # Pivot the data
+    # Format the cohort labels and downcast the rates before pivoting, so
+    # strftime is one vectorized pass and the pivot works on float32
+    df = df.assign(
+        cohort_label=df['cohort_month'].dt.strftime('%Y-%m').astype('category'),
+        retention_rate=df['retention_rate'].astype(np.float32)
+    )
+    
+    # Pivot the data, newest cohort first
     pivot = df.pivot(
-        index='cohort_month',
+        index='cohort_label',
         columns='month_number',
         values='retention_rate'
+    ).sort_index(ascending=False)
+    pivot.index.name = 'cohort_month'
+    
+    # Dense, C-contiguous float32 so the Styler heatmap works on a plain
+    # numeric block (retention rates only need 2 decimals of precision)
+    return pd.DataFrame(
+        np.ascontiguousarray(pivot.to_numpy(dtype=np.float32)),
+        index=pivot.index,
+        columns=pivot.columns
     )
-    
-    # Format cohort_month as string
-    pivot.index = pivot.index.strftime('%Y-%m')
-    
-    # Sort by cohort month descending
-    pivot = pivot.sort_index(ascending=False)
-    
-    return pivot
+
+def style_cohort_retention_table(pivot: pd.DataFrame) -> Styler:
+    """Apply percentage formatting and a retention heatmap to a cohort pivot.
+    
+    Kept separate from create_cohort_retention_table, which is cached:
+    Styler objects can't be pickled, so only the pivot is memoized and the
+    styling is applied on render.
+    """
+    return pivot.style.format("{:.1f}%")\
+        .background_gradient(cmap='RdYlGn', vmin=0, vmax=100)
@@ -0,0 +1,18 @@
+"""Environment configuration."""
+import os
+from functools import lru_cache
+from typing import Optional
+
+from dotenv import load_dotenv
+
+
+@lru_cache(maxsize=1)
+def _load_dotenv_once():
+    """Load .env into the environment on first use rather than at import."""
+    load_dotenv()
+
+
+def get_env(name: str) -> Optional[str]:
+    """Read an environment variable, loading .env the first time."""
+    _load_dotenv_once()
+    return os.getenv(name)
@@ -0,0 +1,103 @@
+"""Cached data loaders for the dashboard.
+
+Streamlit reruns the whole script on every widget interaction, so calling the
+query helpers in utils.database directly would hit Supabase four times per
+click. These wrappers memoize the results with st.cache_data so navigating
+between pages reuses the already-fetched DataFrames.
+
+The query helpers use the shared data client from utils.database.get_client
+rather than taking one here, since the client object cannot be hashed for the
+cache key.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from typing import Any, Dict, List
+
+from utils.database import (
+    get_monthly_revenue,
+    get_revenue_by_plan,
+    get_cohort_retention,
+    get_current_metrics
+)
+
+# Seconds before cached query results are considered stale
+CACHE_TTL = 300
+
+
+# The loaders fetch with raise_errors=True: st.cache_data doesn't cache a
+# call that raises, so a failed query is retried on the next rerun instead
+# of serving an empty frame for CACHE_TTL. load_datasets reports the error.
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_monthly_revenue(months: int = 12) -> pd.DataFrame:
+    """Cached wrapper around get_monthly_revenue."""
+    return get_monthly_revenue(months=months, raise_errors=True)
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_revenue_by_plan(months: int = 12) -> pd.DataFrame:
+    """Cached wrapper around get_revenue_by_plan."""
+    return get_revenue_by_plan(months=months, raise_errors=True)
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_cohort_retention(cohorts: int = 6) -> pd.DataFrame:
+    """Cached wrapper around get_cohort_retention."""
+    return get_cohort_retention(cohorts=cohorts, raise_errors=True)
+
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def load_current_metrics() -> Dict:
+    """Cached wrapper around get_current_metrics."""
+    return get_current_metrics(raise_errors=True)
+
+
+# Dataset name -> (cached loader, size argument it takes, error label, empty result)
+_DATASETS = {
+    "revenue": (load_monthly_revenue, "months", "revenue data", pd.DataFrame),
+    "plans": (load_revenue_by_plan, "months", "plan data", pd.DataFrame),
+    "cohorts": (load_cohort_retention, "cohorts", "cohort data", pd.DataFrame),
+    "metrics": (load_current_metrics, None, "current metrics", dict)
+}
+
+
+def load_datasets(*names: str, months: int = 12, cohorts: int = 6) -> List[Any]:
+    """Load the named datasets concurrently, in the order given.
+    
+    Names are "revenue", "plans", "cohorts" and "metrics"; pages pass only
+    the ones they render. Cache misses run in parallel, so a cold page waits
+    for its slowest query rather than the sum of them. Failures are shown
+    with st.error here on the script thread (elements emitted from worker
+    threads inside a cached call aren't replayed) and come back empty.
+    """
+    sizes = {"months": months, "cohorts": cohorts}
+    ctx = get_script_run_ctx()
+    
+    def attach_ctx():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+    
+    def load(name):
+        loader, size, _, _ = _DATASETS[name]
+        return loader(**{size: sizes[size]}) if size else loader()
+    
+    with ThreadPoolExecutor(max_workers=len(names), initializer=attach_ctx) as executor:
+        futures = [executor.submit(load, name) for name in names]
+    
+    results = []
+    for name, future in zip(names, futures):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            _, _, label, empty = _DATASETS[name]
+            st.error(f"Error fetching {label}: {str(e)}")
+            results.append(empty())
+    return results
+
+
+def clear_data_cache():
+    """Drop all cached query results so the next load re-fetches from Supabase."""
+    st.cache_data.clear()
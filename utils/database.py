@@ -1,97 +1,205 @@
 """Database query utilities."""
+import httpx
 import pandas as pd
-from supabase import Client
-from datetime import datetime, timedelta
-from typing import Dict, List
+from supabase import Client, ClientOptions, PostgrestAPIError, create_client
+from typing import Dict, List, Optional
 import streamlit as st
 
-def get_monthly_revenue(supabase: Client, months: int = 12) -> pd.DataFrame:
+from utils.config import get_env
+
+# Numeric column dtypes per table, so each frame gets one consolidated
+# native block per dtype instead of whatever pandas infers from the JSON
+_DTYPES = {
+    "monthly_revenue": {
+        "mrr": "float64",
+        "customer_count": "int64",
+        "churn_count": "int64",
+        "new_customers": "int64"
+    },
+    "revenue_by_plan": {
+        "revenue": "float64",
+        "customer_count": "int64"
+    },
+    "cohort_retention": {
+        "month_number": "int64",
+        "retention_rate": "float64"
+    }
+}
+
+# Columns the dashboard reads from each table, so PostgREST doesn't serialize
+# ids, timestamps and unused counts
+_COLUMNS = {
+    "monthly_revenue": "month,mrr,customer_count,churn_count,new_customers",
+    "revenue_by_plan": "month,plan_tier,revenue,customer_count",
+    "cohort_retention": "cohort_month,month_number,retention_rate"
+}
+
+@st.cache_resource(show_spinner=False)
+def get_client() -> Client:
+    """Process-wide Supabase client for dashboard data queries.
+    
+    Unlike utils.auth.get_supabase_client, this client never signs a user
+    in, so one instance (and its keep-alive HTTP/2 pool) can safely be shared
+    by every browser session.
+    """
+    url = get_env("SUPABASE_URL")
+    key = get_env("SUPABASE_KEY")
+    if not url or not key:
+        raise RuntimeError("Supabase credentials not found. Please check your .env file.")
+    
+    http_client = httpx.Client(
+        http2=True,
+        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+        timeout=30
+    )
+    return create_client(url, key, options=ClientOptions(httpx_client=http_client))
+
+def _month_cutoff(latest_month: str, months: int) -> str:
+    """First day of the month `months - 1` months before latest_month (inclusive lower bound)."""
+    start = pd.Timestamp(latest_month).replace(day=1) - pd.DateOffset(months=months - 1)
+    return start.strftime("%Y-%m-%d")
+
+# DATE column per table, parsed with a fixed format instead of inferred
+_DATE_COLUMNS = {
+    "monthly_revenue": "month",
+    "revenue_by_plan": "month",
+    "cohort_retention": "cohort_month"
+}
+
+def _to_frame(rows: List[Dict], table: str) -> pd.DataFrame:
+    """Build a DataFrame from PostgREST rows with the table's fixed schema.
+    
+    Columns come from _COLUMNS, numeric dtypes from _DTYPES and the date
+    column is parsed as YYYY-MM-DD, so nothing is inferred from the JSON.
+    """
+    df = pd.DataFrame.from_records(rows, columns=_COLUMNS[table].split(","))
+    df = df.astype(_DTYPES[table])
+    date_column = _DATE_COLUMNS[table]
+    df[date_column] = pd.to_datetime(df[date_column], format="%Y-%m-%d", cache=True)
+    return df
+
+# Each get_* reports a failed query with st.error and returns an empty
+# result. With raise_errors=True the exception propagates instead, which the
+# cached loaders in utils/data_loaders.py rely on so failures aren't cached.
+
+def get_monthly_revenue(
+    supabase: Optional[Client] = None,
+    months: int = 12,
+    raise_errors: bool = False
+) -> pd.DataFrame:
     """Fetch monthly revenue data."""
     try:
+        supabase = supabase or get_client()
         response = supabase.table("monthly_revenue")\
-            .select("*")\
+            .select(_COLUMNS["monthly_revenue"])\
             .order("month", desc=True)\
             .limit(months)\
             .execute()
         
-        df = pd.DataFrame(response.data)
-        if not df.empty:
-            df['month'] = pd.to_datetime(df['month'])
-            df = df.sort_values('month')
-        return df
+        # Newest-first from the LIMIT query; reversing is O(n), no re-sort
+        df = _to_frame(response.data, "monthly_revenue")
+        return df.iloc[::-1].reset_index(drop=True)
     except Exception as e:
+        if raise_errors:
+            raise
         st.error(f"Error fetching revenue data: {str(e)}")
         return pd.DataFrame()
 
-def get_revenue_by_plan(supabase: Client, months: int = 12) -> pd.DataFrame:
+def get_revenue_by_plan(
+    supabase: Optional[Client] = None,
+    months: int = 12,
+    raise_errors: bool = False
+) -> pd.DataFrame:
     """Fetch revenue breakdown by plan tier."""
     try:
-        response = supabase.table("revenue_by_plan")\
-            .select("*")\
+        supabase = supabase or get_client()
+        
+        # Anchor the window on the table's latest month, like the LIMIT in
+        # get_monthly_revenue, so both frames cover the same months even when
+        # the data hasn't been re-seeded recently
+        latest = supabase.table("revenue_by_plan")\
+            .select("month")\
             .order("month", desc=True)\
-            .limit(months * 3)\
+            .limit(1)\
             .execute()
+        if not latest.data:
+            return pd.DataFrame()
         
-        df = pd.DataFrame(response.data)
-        if not df.empty:
-            df['month'] = pd.to_datetime(df['month'])
-            df = df.sort_values(['month', 'plan_tier'])
-        return df
+        # Filter on the month key rather than limiting to months * 3 rows,
+        # which silently assumed exactly three plan tiers
+        response = supabase.table("revenue_by_plan")\
+            .select(_COLUMNS["revenue_by_plan"])\
+            .gte("month", _month_cutoff(latest.data[0]['month'], months))\
+            .order("month")\
+            .order("plan_tier")\
+            .execute()
+        
+        return _to_frame(response.data, "revenue_by_plan")
     except Exception as e:
+        if raise_errors:
+            raise
         st.error(f"Error fetching plan data: {str(e)}")
         return pd.DataFrame()
 
-def get_cohort_retention(supabase: Client, cohorts: int = 6) -> pd.DataFrame:
+def get_cohort_retention(
+    supabase: Optional[Client] = None,
+    cohorts: int = 6,
+    raise_errors: bool = False
+) -> pd.DataFrame:
     """Fetch cohort retention data."""
     try:
-        response = supabase.table("cohort_retention")\
-            .select("*")\
+        supabase = supabase or get_client()
+        
+        # Every cohort has exactly one month 0 row, so this yields the latest
+        # `cohorts` cohort months without fetching the whole table
+        latest = supabase.table("cohort_retention")\
+            .select("cohort_month")\
+            .eq("month_number", 0)\
             .order("cohort_month", desc=True)\
+            .limit(cohorts)\
+            .execute()
+        recent_cohorts = [row['cohort_month'] for row in latest.data]
+        if not recent_cohorts:
+            return pd.DataFrame()
+        
+        response = supabase.table("cohort_retention")\
+            .select(_COLUMNS["cohort_retention"])\
+            .in_("cohort_month", recent_cohorts)\
+            .order("cohort_month")\
+            .order("month_number")\
             .execute()
         
-        df = pd.DataFrame(response.data)
-        if not df.empty:
-            df['cohort_month'] = pd.to_datetime(df['cohort_month'])
-            # Filter to recent cohorts
-            recent_cohorts = df['cohort_month'].unique()[:cohorts]
-            df = df[df['cohort_month'].isin(recent_cohorts)]
-            df = df.sort_values(['cohort_month', 'month_number'])
-        return df
+        return _to_frame(response.data, "cohort_retention")
     except Exception as e:
+        if raise_errors:
+            raise
         st.error(f"Error fetching cohort data: {str(e)}")
         return pd.DataFrame()
 
-def get_current_metrics(supabase: Client) -> Dict:
-    """Get current month's key metrics."""
+# PostgREST error code for a single-object request that matched no rows
+_NO_ROWS = "PGRST116"
+
+def get_current_metrics(supabase: Optional[Client] = None, raise_errors: bool = False) -> Dict:
+    """Get current month's key metrics.
+    
+    Growth and churn are computed in Postgres by the current_metrics()
+    function (see schema.sql), so this is one read-only round-trip that
+    PostgREST returns as a single JSON object.
+    """
     try:
-        # Get latest month's data
-        response = supabase.table("monthly_revenue")\
-            .select("*")\
-            .order("month", desc=True)\
-            .limit(2)\
-            .execute()
-        
-        data = response.data
-        if len(data) < 1:
-            return {}
-        
-        current = data[0]
-        previous = data[1] if len(data) > 1 else current
-        
-        # Calculate growth rates
-        mrr_growth = ((current['mrr'] - previous['mrr']) / previous['mrr'] * 100) if previous['mrr'] > 0 else 0
-        customer_growth = ((current['customer_count'] - previous['customer_count']) / previous['customer_count'] * 100) if previous['customer_count'] > 0 else 0
-        churn_rate = (current['churn_count'] / current['customer_count'] * 100) if current['customer_count'] > 0 else 0
-        
-        return {
-            'mrr': current['mrr'],
-            'mrr_growth': mrr_growth,
-            'customers': current['customer_count'],
-            'customer_growth': customer_growth,
-            'churn_rate': churn_rate,
-            'new_customers': current['new_customers']
-        }
+        supabase = supabase or get_client()
+        response = supabase.rpc("current_metrics", get=True).single().execute()
+        return response.data or {}
+    except PostgrestAPIError as e:
+        if e.code != _NO_ROWS:
+            if raise_errors:
+                raise
+            st.error(f"Error fetching current metrics: {str(e)}")
+        # PGRST116: no monthly_revenue rows yet
+        return {}
     except Exception as e:
+        if raise_errors:
+            raise
         st.error(f"Error fetching current metrics: {str(e)}")
         return {}
 
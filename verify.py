@@ -2,65 +2,128 @@
 """
 Verification script to check if the dashboard is properly set up.
 Run this before deploying to catch common issues.
+
+Usage: python verify.py [-v]
 """
 
+import importlib.util
+import io
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
 
+REQUIRED_FILES = (
+    "app.py",
+    "requirements.txt",
+    ".env.example",
+    ".gitignore",
+    "schema.sql",
+    "seed_data.py",
+    "README.md",
+    "CUSTOMIZATION.md",
+    "QUICKSTART.md",
+    "utils/auth.py",
+    "utils/database.py",
+    "utils/charts.py",
+    "utils/ai_insights.py",
+    "assets/style.css"
+)
+
+PACKAGES = (
+    "streamlit",
+    "supabase",
+    "plotly",
+    "pandas",
+    "anthropic",
+    "dotenv"
+)
+
+MODULES = (
+    "utils.auth",
+    "utils.database",
+    "utils.charts",
+    "utils.ai_insights"
+)
+
+PYTHON_FILES = (
+    "app.py",
+    "seed_data.py",
+    "utils/auth.py",
+    "utils/database.py",
+    "utils/charts.py",
+    "utils/ai_insights.py"
+)
+
+@lru_cache(maxsize=None)
+def files_in(directory):
+    """Names of the regular files in a directory, from a single scandir pass."""
+    try:
+        with os.scandir(directory) as entries:
+            return frozenset(entry.name for entry in entries if entry.is_file())
+    except OSError:
+        return frozenset()
+
+def file_exists(path):
+    """Check a file via its directory's cached listing instead of a stat per file."""
+    path = Path(path)
+    return path.name in files_in(str(path.parent))
+
 def check_mark(condition, message):
     """Print check mark or X based on condition."""
     symbol = "✅" if condition else "❌"
     print(f"{symbol} {message}")
     return condition
 
-def verify_files():
-    """Verify all required files exist."""
+def print_rows(rows):
+    """Print (condition, message) rows like check_mark, in one write."""
+    sys.stdout.write("".join(f"{'✅' if ok else '❌'} {message}\n" for ok, message in rows))
+    return all(ok for ok, _ in rows)
+
+def verify_files(verbose=False):
+    """Verify all required files exist.
+    
+    Lists every file only in verbose mode or when one is missing; otherwise
+    the short-circuiting all() settles it with a single summary line.
+    """
     print("\n📁 Checking Files...")
     
-    required_files = [
-        "app.py",
-        "requirements.txt",
-        ".env.example",
-        ".gitignore",
-        "schema.sql",
-        "seed_data.py",
-        "README.md",
-        "CUSTOMIZATION.md",
-        "QUICKSTART.md",
-        "utils/auth.py",
-        "utils/database.py",
-        "utils/charts.py",
-        "utils/ai_insights.py",
-        "assets/style.css"
-    ]
-    
-    all_exist = True
-    for file in required_files:
-        exists = Path(file).exists()
-        all_exist = all_exist and check_mark(exists, f"{file}")
-    
-    return all_exist
+    if not verbose and all(file_exists(file) for file in REQUIRED_FILES):
+        return check_mark(True, f"All {len(REQUIRED_FILES)} required files present")
+    
+    return print_rows([(file_exists(file), file) for file in REQUIRED_FILES])
+
+def parse_env(text):
+    """Parse KEY=value lines from a .env file into a dict, skipping comments."""
+    return dict(
+        (key.strip(), value.strip())
+        for key, _, value in (
+            line.partition("=") for line in text.splitlines()
+            if "=" in line and not line.lstrip().startswith("#")
+        )
+    )
 
 def verify_env():
     """Check if .env file is set up."""
     print("\n🔐 Checking Environment...")
     
-    env_exists = Path(".env").exists()
+    env_exists = file_exists(".env")
     check_mark(env_exists, ".env file exists")
     
     if env_exists:
-        with open(".env") as f:
-            content = f.read()
-            has_supabase_url = "SUPABASE_URL=" in content and "your_supabase" not in content
-            has_supabase_key = "SUPABASE_KEY=" in content and "your_supabase" not in content
-            has_claude_key = "ANTHROPIC_API_KEY=" in content and "your_anthropic" not in content
-            
-            check_mark(has_supabase_url, "SUPABASE_URL configured")
-            check_mark(has_supabase_key, "SUPABASE_KEY configured")
-            check_mark(has_claude_key, "ANTHROPIC_API_KEY configured")
-            
-            return has_supabase_url and has_supabase_key and has_claude_key
+        env = parse_env(Path(".env").read_text())
+        # A missing key counts as unconfigured, same as a placeholder value
+        has_supabase_url = "your_supabase" not in env.get("SUPABASE_URL", "your_supabase")
+        has_supabase_key = "your_supabase" not in env.get("SUPABASE_KEY", "your_supabase")
+        has_claude_key = "your_anthropic" not in env.get("ANTHROPIC_API_KEY", "your_anthropic")
+        
+        check_mark(has_supabase_url, "SUPABASE_URL configured")
+        check_mark(has_supabase_key, "SUPABASE_KEY configured")
+        check_mark(has_claude_key, "ANTHROPIC_API_KEY configured")
+        
+        return has_supabase_url and has_supabase_key and has_claude_key
     else:
         print("   ⚠️  Copy .env.example to .env and configure")
         return False
@@ -69,68 +132,40 @@ def verify_dependencies():
     """Check if dependencies are installed."""
     print("\n📦 Checking Dependencies...")
     
-    packages = [
-        "streamlit",
-        "supabase",
-        "plotly",
-        "pandas",
-        "anthropic",
-        "dotenv"
-    ]
-    
-    all_installed = True
-    for package in packages:
-        try:
-            __import__(package)
-            check_mark(True, package)
-        except ImportError:
-            check_mark(False, f"{package} (run: pip install -r requirements.txt)")
-            all_installed = False
+    rows = []
+    for package in PACKAGES:
+        # Resolve the spec only; importing would execute the whole package
+        installed = importlib.util.find_spec(package) is not None
+        rows.append((installed, package if installed else f"{package} (run: pip install -r requirements.txt)"))
     
-    return all_installed
+    return print_rows(rows)
 
 def verify_imports():
     """Check if custom modules can be imported."""
     print("\n🔧 Checking Custom Modules...")
     
-    modules = [
-        "utils.auth",
-        "utils.database",
-        "utils.charts",
-        "utils.ai_insights"
-    ]
-    
-    all_ok = True
-    for module in modules:
+    rows = []
+    for module in MODULES:
         try:
             __import__(module)
-            check_mark(True, module)
+            rows.append((True, module))
         except Exception as e:
-            check_mark(False, f"{module} ({str(e)})")
-            all_ok = False
+            rows.append((False, f"{module} ({str(e)})"))
     
-    return all_ok
+    return print_rows(rows)
 
 def count_lines():
     """Count total lines of Python code."""
     print("\n📊 Code Statistics...")
     
-    python_files = [
-        "app.py",
-        "seed_data.py",
-        "utils/auth.py",
-        "utils/database.py",
-        "utils/charts.py",
-        "utils/ai_insights.py"
-    ]
-    
     total_lines = 0
-    for file in python_files:
-        if Path(file).exists():
-            with open(file) as f:
-                lines = len(f.readlines())
-                total_lines += lines
-                print(f"   {file}: {lines} lines")
+    for file in PYTHON_FILES:
+        if file_exists(file):
+            data = Path(file).read_bytes()
+            # Same count as readlines(): a final line without a newline counts too
+            lines = data.count(b"\n") + (1 if data and not data.endswith(b"\n") else 0)
+            total_lines += lines
+            print(f"   {file}: {lines} lines")
     
     print(f"\n   Total: {total_lines} lines")
     under_limit = total_lines < 1000
@@ -142,38 +177,80 @@ def verify_git():
     """Check git repository status."""
     print("\n🔀 Checking Git Repository...")
     
-    is_git = Path(".git").exists()
+    is_git = Path(".git").is_dir()
     check_mark(is_git, "Git repository initialized")
     
     if is_git:
         import subprocess
         try:
+            # Only emptiness matters, so keep the raw NUL-separated bytes
             result = subprocess.run(
-                ["git", "status", "--porcelain"],
-                capture_output=True,
-                text=True
+                ["git", "status", "--porcelain", "-z"],
+                capture_output=True
             )
-            is_clean = len(result.stdout.strip()) == 0
+            is_clean = not result.stdout
             check_mark(is_clean, "All changes committed")
             return is_clean
         except:
             return False
     return False
 
+class ThreadOutput(io.TextIOBase):
+    """Stand-in for sys.stdout that gives each check thread its own buffer."""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+    
+    def write(self, text):
+        return getattr(self.local, "buffer", self.stream).write(text)
+    
+    def flush(self):
+        self.stream.flush()
+
+def run_buffered(check, output):
+    """Run a check with its prints captured; returns (result, printed text)."""
+    output.local.buffer = io.StringIO()
+    try:
+        result = check()
+    finally:
+        text = output.local.buffer.getvalue()
+        del output.local.buffer
+    return result, text
+
+def run_checks(checks):
+    """Run the checks concurrently, printing each one's output in order."""
+    output = ThreadOutput(sys.stdout)
+    sys.stdout = output
+    try:
+        with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+            futures = [executor.submit(run_buffered, check, output) for _, check in checks]
+            results = []
+            for (name, _), future in zip(checks, futures):
+                result, text = future.result()
+                output.stream.write(text)
+                results.append((name, result))
+    finally:
+        sys.stdout = output.stream
+    return results
+
 def main():
-    """Run all verification checks."""
+    """Run all verification checks (pass -v to list every required file)."""
+    verbose = "-v" in sys.argv[1:]
+    
     print("=" * 60)
     print("🔍 SaaS Analytics Dashboard - Verification Script")
     print("=" * 60)
     
-    checks = [
-        ("Files", verify_files()),
-        ("Environment", verify_env()),
-        ("Dependencies", verify_dependencies()),
-        ("Modules", verify_imports()),
-        ("Code Size", count_lines()),
-        ("Git", verify_git())
-    ]
+    # Independent checks run in parallel (git and the imports dominate)
+    checks = run_checks([
+        ("Files", partial(verify_files, verbose)),
+        ("Environment", verify_env),
+        ("Dependencies", verify_dependencies),
+        ("Modules", verify_imports),
+        ("Code Size", count_lines),
+        ("Git", verify_git)
+    ])
     
     print("\n" + "=" * 60)
     print("📋 Summary")